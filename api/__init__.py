@@ -2,4 +2,4 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-__all__ = ["main", "schemas", "ai_engine", "format_engine", "utils"]
+__all__ = ["main", "schemas", "ai_engine", "format_engine", "utils", "regeneration", "template_engine", "profiling", "matching", "packaging"]
@@ -3,11 +3,12 @@
 import os
 import json
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 from dotenv import load_dotenv
 load_dotenv()
 
+from services.cassette import CassetteMiss
 from services.llm_service import hybrid_llm   # <-- NEW IMPORT (replaces OpenAI direct call)
 
 PROMPT_PATH = Path(__file__).resolve().parent / "prompts" / "applify_super_prompt.txt"
@@ -37,14 +38,32 @@ class AIEngine:
         self.model = model
         self.system_prompt = load_system_prompt()
 
-    def generate_documents(self, candidate_payload: Dict[str, Any], max_tokens: int = 3000) -> Dict[str, Any]:
+    def reload_prompt(self):
+        """
+        Re-read the super prompt from disk (hot reload, no restart needed).
+        """
+        self.system_prompt = load_system_prompt()
+
+    def generate_documents(
+        self,
+        candidate_payload: Dict[str, Any],
+        max_tokens: int = 3000,
+        sections: Optional[List[str]] = None,
+        overrides: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
         """
         Builds the prompt and sends it to the hybrid LLM engine.
         Expects a strict JSON object per Applify Super Prompt spec.
+
+        sections: only ask the model for these output keys (partial regeneration)
+        overrides: Anschreiben fields fixed by the user (e.g. salutation)
         """
 
         # Build user message as JSON
-        user_json = json.dumps({"candidate": candidate_payload}, ensure_ascii=False)
+        user_data = {"candidate": candidate_payload}
+        if overrides:
+            user_data["cover_letter_overrides"] = overrides
+        user_json = json.dumps(user_data, ensure_ascii=False)
 
         # Combine system + user into single prompt for Gemini/DeepSeek compatibility
         full_prompt = (
@@ -52,10 +71,18 @@ class AIEngine:
             + "\n\nUSER_CANDIDATE_DATA:\n"
             + user_json
         )
+        if sections:
+            full_prompt += (
+                "\n\nREGENERATE_ONLY:\n"
+                "Return a JSON object with ONLY these keys: " + ", ".join(sections)
+                + ". Use cover_letter_overrides verbatim where given."
+            )
 
         # Call LLM (Gemini → DeepSeek → OpenAI)
         try:
             raw_output = hybrid_llm(full_prompt)
+        except CassetteMiss:
+            raise
         except Exception as e:
             raise RuntimeError(f"LLM engine error: {str(e)}")
 
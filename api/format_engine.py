@@ -1,12 +1,12 @@
 # api/format_engine.py
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from jinja2 import Environment, FileSystemLoader
 from pathlib import Path
 from typing import Dict
 
-TEMPLATES_DIR = Path(__file__).resolve().parent / "templates"
+TEMPLATES_DIR = Path(__file__).resolve().parent / "template"
 env = Environment(
     loader=FileSystemLoader(TEMPLATES_DIR),
-    autoescape=select_autoescape(enabled_extensions=("j2",))
+    autoescape=False,  # templates produce plain text for PDF/DOCX, not HTML
 )
 
 def render_cv_text(cv_data: Dict) -> str:
@@ -16,3 +16,12 @@ def render_cv_text(cv_data: Dict) -> str:
 def render_cover_letter_text(cl_data: Dict) -> str:
     template = env.get_template("german_cover_letter_template.j2")
     return template.render(**cl_data)
+
+def warm_templates():
+    # Compile both templates once; the environment caches them afterwards
+    env.get_template("german_resume_template.j2")
+    env.get_template("german_cover_letter_template.j2")
+
+def clear_template_cache():
+    # Next get_template() re-reads the .j2 files from disk
+    env.cache.clear()
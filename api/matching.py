@@ -0,0 +1,370 @@
+# api/matching.py
+"""
+Local job-fit scoring: ranks job ads against a candidate without any LLM.
+
+Job ads are tokenized into normalized skill terms (German and English
+synonyms map to one canonical term) plus remaining content words, and put
+into an inverted index. The candidate's skills and job titles form the query,
+ranked with BM25. Required GER language levels found in an ad scale the
+score down when the candidate does not reach them.
+"""
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+# canonical skill -> German / English variants. Variants must not be common
+# words on their own ("Container", "den Rest", "Office Manager", "Lager",
+# "Pflege" of a system), or unrelated ads start matching.
+SKILL_SYNONYMS: Dict[str, List[str]] = {
+    "python": ["python3"],
+    "javascript": ["js", "java script"],
+    "typescript": [],
+    "c++": ["cpp"],
+    "c#": ["csharp", "c sharp"],
+    "sql": ["mysql", "postgresql", "postgres", "sql server"],
+    "machine learning": ["maschinelles lernen", "ml"],
+    "data analysis": ["datenanalyse", "data analytics", "datenauswertung"],
+    "artificial intelligence": ["künstliche intelligenz"],
+    "project management": ["projektmanagement", "projektleitung", "projektmanager"],
+    "microsoft office": ["ms office", "office 365", "microsoft 365"],
+    "excel": ["ms excel", "microsoft excel"],
+    "communication": ["kommunikation", "kommunikationsfähigkeit", "kommunikationsstärke", "communication skills"],
+    "teamwork": ["teamfähigkeit", "teamarbeit", "teamplayer", "team player"],
+    "customer service": ["kundenservice", "kundenbetreuung", "kundendienst", "customer support"],
+    "sales": ["vertrieb", "verkauf"],
+    "accounting": ["buchhaltung", "finanzbuchhaltung", "rechnungswesen", "bookkeeping"],
+    "logistics": ["logistik", "lagerlogistik"],
+    "warehouse": ["lagerarbeit", "lagerist", "kommissionierung"],
+    "nursing": ["krankenpflege", "altenpflege", "pflegefachkraft"],
+    "driving licence": ["führerschein", "fahrerlaubnis", "driver's license", "drivers license", "driving license"],
+    "forklift": ["gabelstapler", "staplerschein"],
+    "cloud": ["cloud computing"],
+    "aws": ["amazon web services"],
+    "docker": [],
+    "kubernetes": ["k8s"],
+    "rest api": ["restful", "rest apis", "rest-api", "rest-apis"],
+    "frontend": ["front end", "front-end"],
+    "backend": ["back end", "back-end"],
+    "software development": ["softwareentwicklung", "software engineering"],
+    "web development": ["webentwicklung"],
+    "marketing": ["online marketing", "onlinemarketing"],
+    "social media": ["soziale medien"],
+    "problem solving": ["problemlösung", "lösungsorientiert"],
+    "electrician": ["elektriker", "elektroniker"],
+    "mechanic": ["mechaniker", "mechatroniker"],
+}
+
+# language name -> ISO code, German and English spellings
+LANGUAGE_ALIASES: Dict[str, str] = {
+    "deutsch": "de", "german": "de",
+    "englisch": "en", "english": "en",
+    "französisch": "fr", "french": "fr",
+    "spanisch": "es", "spanish": "es",
+    "italienisch": "it", "italian": "it",
+    "türkisch": "tr", "turkish": "tr",
+    "arabisch": "ar", "arabic": "ar",
+    "russisch": "ru", "russian": "ru",
+    "polnisch": "pl", "polish": "pl",
+    "ukrainisch": "uk", "ukrainian": "uk",
+}
+
+GER_LEVELS = ["a1", "a2", "b1", "b2", "c1", "c2"]
+
+# descriptive level words -> GER level
+LEVEL_WORDS: Dict[str, str] = {
+    "muttersprache": "c2", "muttersprachlich": "c2", "native": "c2",
+    "verhandlungssicher": "c1", "fließend": "c1", "fliessend": "c1", "fluent": "c1",
+    "sehr": "c1", "gut": "b2", "gute": "b2", "good": "b2",
+    "grundkenntnisse": "a2", "basic": "a2", "basis": "a2",
+}
+DEFAULT_REQUIRED_LEVEL = "b1"
+
+STOPWORDS = set("""
+und oder der die das den dem des ein eine einer eines einem einen mit für von zu zur zum im in am an auf
+bei aus als auch sich sie wir ihr ihre ihren unser unsere unseren sind ist wird werden haben hat nach über
+wie sowie bzw mind min sehr gute gut kenntnisse erfahrung erfahrungen m w d mwd
+and or the a an of to for with in on at by from as is are be will you your we our us have has
+experience knowledge skills strong good very
+""".split())
+
+K1 = 1.5
+B = 0.75
+
+# unknown multi-word skills ("Power BI") are matched as a whole up to this
+# length; longer ones are split into words
+NGRAM_MAX = 3
+
+# analyzed ads kept across requests; users re-rank the same saved ads
+AD_CACHE_SIZE = 4096
+
+_TOKEN_RE = re.compile(r"[a-zäöüß0-9+#]+(?:[.'][a-zäöüß0-9+#]+)*")
+
+
+def _normalize(text: str) -> str:
+    return unicodedata.normalize("NFKC", text or "").lower()
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall(_normalize(text))
+
+
+def _build_phrase_map() -> Tuple[Dict[Tuple[str, ...], str], int]:
+    phrases = {}
+    for canonical, variants in SKILL_SYNONYMS.items():
+        for variant in [canonical] + variants:
+            phrases[tuple(_tokens(variant))] = canonical
+    return phrases, max(len(p) for p in phrases)
+
+
+PHRASES, MAX_PHRASE = _build_phrase_map()
+PHRASE_STARTS = {phrase[0] for phrase in PHRASES}
+CANONICAL_TERMS = set(PHRASES.values())
+
+
+def _terms(tokens: List[str]) -> List[str]:
+    terms = []
+    i = 0
+    while i < len(tokens):
+        if tokens[i] not in PHRASE_STARTS:
+            if tokens[i] not in STOPWORDS and len(tokens[i]) > 1:
+                terms.append(tokens[i])
+            i += 1
+            continue
+        for n in range(min(MAX_PHRASE, len(tokens) - i), 0, -1):
+            canonical = PHRASES.get(tuple(tokens[i:i + n]))
+            if canonical:
+                terms.append(canonical)
+                i += n
+                break
+        else:
+            if tokens[i] not in STOPWORDS and len(tokens[i]) > 1:
+                terms.append(tokens[i])
+            i += 1
+    return terms
+
+
+def _phrase_count(tokens: Tuple[str, ...], phrase: Tuple[str, ...]) -> int:
+    # occurrences of a word sequence; index() jumps between first words in C
+    count, n, first = 0, len(phrase), phrase[0]
+    i = -1
+    while True:
+        try:
+            i = tokens.index(first, i + 1)
+        except ValueError:
+            return count
+        if tokens[i:i + n] == phrase:
+            count += 1
+
+
+def extract_terms(text: str) -> List[str]:
+    """
+    Tokenize text into canonical skill terms (longest synonym match first)
+    plus remaining non-stopword tokens.
+    """
+    return _terms(_tokens(text))
+
+
+def skill_term(skill: str) -> Optional[str]:
+    """
+    Canonical term for one candidate skill; multi-word skills without a
+    synonym entry stay one phrase ("power bi") and match that word sequence in ads.
+    """
+    tokens = tuple(_tokens(skill))
+    if not tokens:
+        return None
+    if tokens in PHRASES:
+        return PHRASES[tokens]
+    content = tuple(t for t in tokens if t not in STOPWORDS) or tokens
+    return PHRASES.get(content, " ".join(content))
+
+
+_LANGUAGE_RE = re.compile(
+    r"^(" + "|".join(LANGUAGE_ALIASES) + r")(kenntniss?e?n?|sprachig\w*)?$"
+)
+_LANGUAGE_PREFIXES = {alias[:4] for alias in LANGUAGE_ALIASES}
+
+
+def _language_code(token: str) -> Optional[str]:
+    # "deutsch", "deutschkenntnisse", "englischsprachig" - but not "deutschland"
+    if token[:4] not in _LANGUAGE_PREFIXES:
+        return None
+    match = _LANGUAGE_RE.match(token)
+    return LANGUAGE_ALIASES[match.group(1)] if match else None
+
+
+def _level(token: str) -> Optional[str]:
+    token = token.strip("().,:;")
+    if token in GER_LEVELS:
+        return token
+    return LEVEL_WORDS.get(token)
+
+
+def _required_languages(tokens: List[str]) -> Dict[str, str]:
+    required: Dict[str, str] = {}
+    for i, token in enumerate(tokens):
+        code = _language_code(token)
+        if not code:
+            continue
+        # look a few words after the mention, else before it, never past
+        # another language ("Englisch fließend, Deutsch C1"); looking back,
+        # an explicit GER level belongs to the previous mention ("B2, fließend Englisch")
+        levels, explicit = [], []
+        for backward, window in ((False, tokens[i + 1:i + 5]), (True, reversed(tokens[max(0, i - 3):i]))):
+            for t in window:
+                if _language_code(t) or (backward and t in GER_LEVELS):
+                    break
+                level = _level(t)
+                if level:
+                    levels.append(level)
+                    if t in GER_LEVELS:
+                        explicit.append(level)
+            if levels:
+                break
+        if not levels and "kenntnis" not in token:
+            continue  # "a German company" is no language requirement
+        # explicit GER levels beat descriptive words
+        level = max(explicit or levels or [DEFAULT_REQUIRED_LEVEL], key=GER_LEVELS.index)
+        if code not in required or GER_LEVELS.index(level) > GER_LEVELS.index(required[code]):
+            required[code] = level
+    return required
+
+
+def required_languages(text: str) -> Dict[str, str]:
+    """
+    GER levels an ad asks for, e.g. "Deutschkenntnisse (mind. B2)",
+    "fließend Englisch", "German C1". Highest level wins per language.
+    """
+    return _required_languages(_tokens(text))
+
+
+@lru_cache(maxsize=AD_CACHE_SIZE)
+def analyze_ad(text: str) -> Tuple[Dict[str, int], Tuple[str, ...], Dict[str, str]]:
+    """
+    Term frequencies, tokens and required languages of one ad, tokenized
+    once. Cached by text; callers must not mutate the returned dicts.
+    """
+    tokens = _tokens(text)
+    return dict(Counter(_terms(tokens))), tuple(tokens), _required_languages(tokens)
+
+
+def candidate_languages(candidate: Dict[str, Any]) -> Dict[str, str]:
+    levels = {}
+    for item in candidate.get("languages") or []:
+        code = next((c for c in map(_language_code, _tokens(item.get("language", ""))) if c), None)
+        level = None
+        for token in _tokens(item.get("level", "")):
+            level = _level(token) or level
+        if code and level:
+            levels[code] = level
+    return levels
+
+
+class SkillIndex:
+    """
+    Inverted index over job ads: term -> [(ad position, term frequency)].
+    """
+    def __init__(self, term_counts: List[Dict[str, int]], lengths: Optional[List[int]] = None):
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.lengths: List[int] = []
+        for position, terms in enumerate(term_counts):
+            self.lengths.append(lengths[position] if lengths is not None else sum(terms.values()))
+            for term, tf in terms.items():
+                self.postings[term].append((position, tf))
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+    def idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        n = len(self.lengths)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def bm25(self, query: Dict[str, float]) -> Tuple[List[float], List[List[str]]]:
+        """
+        Score all ads for a weighted query; returns (scores, matched terms per ad).
+        """
+        scores = [0.0] * len(self.lengths)
+        matched: List[List[str]] = [[] for _ in self.lengths]
+        for term, weight in query.items():
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            for position, tf in postings:
+                norm = K1 * (1 - B + B * self.lengths[position] / (self.avg_length or 1))
+                scores[position] += weight * idf * tf * (K1 + 1) / (tf + norm)
+                matched[position].append(term)
+        return scores, matched
+
+
+def candidate_query(candidate: Dict[str, Any]) -> Dict[str, float]:
+    """
+    Skills weigh fully, job titles of past positions half. Unknown skills
+    longer than NGRAM_MAX words are split, their words sharing the weight.
+    """
+    query: Dict[str, float] = {}
+    for skill in candidate.get("skills") or []:
+        term = skill_term(skill)
+        if not term:
+            continue
+        words = term.split()
+        if len(words) > NGRAM_MAX and term not in CANONICAL_TERMS:
+            for word in words:
+                query[word] = max(query.get(word, 0.0), 1.0 / len(words))
+        else:
+            query[term] = 1.0
+    for exp in candidate.get("experience") or []:
+        for term in extract_terms(exp.get("job_title", "")):
+            query.setdefault(term, 0.5)
+    return query
+
+
+def rank_jobs(candidate: Dict[str, Any], jobs: List[Dict[str, Any]], top_k: int = 10) -> List[Dict[str, Any]]:
+    """
+    Rank job ads ({"id", "title", "text"}) for a candidate payload.
+    """
+    texts = [f"{job.get('title') or ''}\n{job.get('text', '')}" for job in jobs]
+    analyzed = [analyze_ad(text) for text in texts]
+    query = candidate_query(candidate)
+    # skills extract_terms() cannot produce - unknown phrases ("power bi")
+    # and one-letter skills ("r", "c") - are counted in the ad tokens directly;
+    # lengths count terms only, so they do not skew BM25 length normalization
+    scanned = [
+        (term, tuple(term.split())) for term in query
+        if term not in CANONICAL_TERMS and (" " in term or (len(term) == 1 and term not in STOPWORDS))
+    ]
+    term_counts, lengths = [], []
+    for terms, tokens, _ in analyzed:
+        lengths.append(sum(terms.values()))
+        found = {}
+        for term, phrase in scanned:
+            tf = _phrase_count(tokens, phrase)
+            if tf:
+                found[term] = tf
+        term_counts.append({**terms, **found} if found else terms)
+    index = SkillIndex(term_counts, lengths)
+    scores, matched = index.bm25(query)
+    have = candidate_languages(candidate)
+
+    results = []
+    for position, job in enumerate(jobs):
+        factor = 1.0
+        missing = []
+        for code, level in analyzed[position][2].items():
+            shortfall = GER_LEVELS.index(level) - (GER_LEVELS.index(have[code]) if code in have else -1)
+            if shortfall > 0:
+                # each missing GER step halves the fit
+                factor *= 0.5 ** shortfall
+                missing.append({"language": code, "required": level.upper(), "have": have.get(code, "").upper() or None})
+        results.append({
+            "position": position,
+            "id": job.get("id"),
+            "title": job.get("title") or texts[position].strip().split("\n")[0][:80],
+            "score": round(scores[position] * factor, 4),
+            "matched_skills": sorted(set(matched[position])),
+            "missing_languages": missing,
+        })
+
+    results.sort(key=lambda r: r["score"], reverse=True)
+    return results[:top_k]
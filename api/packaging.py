@@ -0,0 +1,262 @@
+# api/packaging.py
+"""
+Bewerbungsmappe assembly: Anschreiben, Lebenslauf and Zeugnisse in one PDF.
+
+Cover letter and CV are typeset straight into the packet with one embedded
+font, uploaded certificate PDFs are appended with insert_pdf (pages are
+copied as PDF objects, never re-rendered). Before saving, fonts are cut down
+to the glyphs in use, duplicate objects are merged, and scanned images above
+the target resolution are re-encoded as smaller JPEGs.
+
+The finished PDF is written to a spooled temp file (in memory up to
+SPOOL_BYTES, then on disk) and streamed out in chunks. Limits:
+  - APPLIFY_PACKET_MAX_PAGES (default 60)
+  - APPLIFY_PACKET_MAX_ATTACHMENTS (default 20)
+  - APPLIFY_ATTACHMENT_MAX_MB per upload (default 15)
+  - APPLIFY_PACKET_IMAGE_DPI (default 150, 0 disables downsampling)
+  - APPLIFY_PACKET_JPEG_QUALITY (default 80)
+"""
+import io
+import os
+import re
+import tempfile
+import unicodedata
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+PACKET_MAX_PAGES = int(os.getenv("APPLIFY_PACKET_MAX_PAGES", 60))
+PACKET_MAX_ATTACHMENTS = int(os.getenv("APPLIFY_PACKET_MAX_ATTACHMENTS", 20))
+ATTACHMENT_MAX_BYTES = int(float(os.getenv("APPLIFY_ATTACHMENT_MAX_MB", 15)) * 1024 * 1024)
+DEFAULT_IMAGE_DPI = int(os.getenv("APPLIFY_PACKET_IMAGE_DPI", 150))
+JPEG_QUALITY = int(os.getenv("APPLIFY_PACKET_JPEG_QUALITY", 80))
+
+SPOOL_BYTES = 8 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+PAGE_RECT = fitz.paper_rect("a4")
+TEXT_RECT = PAGE_RECT + (72, 72, -72, -72)
+TITLE_SIZE = 14
+BODY_SIZE = 11
+# re-encode only images noticeably above the target resolution
+DPI_TOLERANCE = 1.25
+
+
+class PacketError(ValueError):
+    """An attachment cannot go into the packet (not a PDF, encrypted, ...)."""
+
+
+class PacketTooLarge(PacketError):
+    """The packet would exceed the configured page or upload limits."""
+
+
+class _PdfSink:
+    """
+    File wrapper for Document.save(): PyMuPDF 1.24 treats the return value
+    of write() as an object and fails on real files, so return nothing.
+    """
+    def __init__(self, f: BinaryIO):
+        self.f = f
+
+    def write(self, data: bytes):
+        self.f.write(data)
+
+    def seek(self, offset: int, whence: int = 0):
+        return self.f.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self.f.tell()
+
+    def truncate(self, *args):
+        self.f.truncate(*args)
+
+
+def packet_filename(name: Optional[str]) -> str:
+    # ASCII only, so the name is safe in a Content-Disposition header
+    ascii_name = unicodedata.normalize("NFKD", name or "").encode("ascii", "ignore").decode()
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", ascii_name).strip("_")
+    return f"Bewerbungsmappe_{slug}.pdf" if slug else "Bewerbungsmappe.pdf"
+
+
+def add_text_document(doc: fitz.Document, font: fitz.Font, title: str, body: str) -> int:
+    """
+    Typeset title + body onto new A4 pages; returns the index of the first page.
+    All pages use the same font object, so it is embedded only once.
+    """
+    first = doc.page_count
+    remaining = body or ""
+    heading = title
+    while True:
+        page = doc.new_page(width=PAGE_RECT.width, height=PAGE_RECT.height)
+        writer = fitz.TextWriter(page.rect)
+        rect = fitz.Rect(TEXT_RECT)
+        if heading:
+            writer.fill_textbox(rect, heading, font=font, fontsize=TITLE_SIZE)
+            rect.y0 += TITLE_SIZE * 2.5
+            heading = None
+        overflow = writer.fill_textbox(rect, remaining, font=font, fontsize=BODY_SIZE)
+        writer.write_text(page)
+        if not overflow:
+            return first
+        remaining = "\n".join(line for line, _width in overflow)
+
+
+def _read_limited(name: str, source: BinaryIO) -> bytes:
+    data = source.read(ATTACHMENT_MAX_BYTES + 1)
+    if len(data) > ATTACHMENT_MAX_BYTES:
+        raise PacketTooLarge(f"{name} exceeds {ATTACHMENT_MAX_BYTES // (1024 * 1024)} MB")
+    return data
+
+
+def insert_attachment(doc: fitz.Document, name: str, source: BinaryIO) -> int:
+    """
+    Append all pages of an uploaded PDF; returns the index of its first page.
+    Only one source document is open at a time.
+    """
+    data = _read_limited(name, source)
+    try:
+        src = fitz.open(stream=data, filetype="pdf")
+    except Exception:
+        raise PacketError(f"{name} is not a readable PDF")
+    del data
+    try:
+        if src.needs_pass:
+            raise PacketError(f"{name} is password protected")
+        if doc.page_count + src.page_count > PACKET_MAX_PAGES:
+            raise PacketTooLarge(f"Bewerbungsmappe would exceed {PACKET_MAX_PAGES} pages")
+        first = doc.page_count
+        doc.insert_pdf(src)
+        return first
+    finally:
+        src.close()
+
+
+def _decode_image(doc: fitz.Document, xref: int, size: Tuple[int, int]) -> Image.Image:
+    """
+    Decode an image as RGB or grayscale. JPEG streams are decoded by Pillow
+    in draft mode, which scales in the DCT domain and never materializes the
+    full-resolution bitmap; everything else goes through MuPDF.
+    """
+    if doc.xref_get_key(xref, "Filter")[1] == "/DCTDecode":
+        image = Image.open(io.BytesIO(doc.xref_stream_raw(xref)))
+        if image.mode in ("RGB", "L"):
+            image.draft(image.mode, size)
+            return image
+    pix = fitz.Pixmap(doc, xref)
+    if pix.alpha:
+        pix = fitz.Pixmap(pix, 0)
+    if pix.colorspace is None or pix.colorspace.n not in (1, 3):
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+    return Image.frombytes("L" if pix.n == 1 else "RGB", (pix.width, pix.height), pix.samples)
+
+
+def downsample_images(doc: fitz.Document, first_page: int = 0, dpi: int = DEFAULT_IMAGE_DPI) -> int:
+    """
+    Re-encode images shown above `dpi` as JPEG at `dpi`, keeping the
+    replacement only when it is smaller. Returns the number of images replaced.
+    Images with transparency and 1-bit scans (already compact) are left alone.
+    """
+    replaced = 0
+    seen = set()
+    for page in doc.pages(first_page):
+        for item in page.get_images(full=True):
+            xref, smask, width, height, bpc = item[:5]
+            if xref in seen or smask or bpc == 1:
+                continue
+            seen.add(xref)
+            # get_image_rects() would decode and hash every image; the bbox
+            # lookup by name only runs the page content
+            try:
+                shown = page.get_image_bbox(item)
+            except ValueError:
+                continue
+            if shown.is_empty or shown.is_infinite:
+                continue
+            scale = min(dpi / (width / (shown.width / 72)), dpi / (height / (shown.height / 72)))
+            if scale * DPI_TOLERANCE >= 1:
+                continue
+
+            size = (max(1, int(width * scale)), max(1, int(height * scale)))
+            image = _decode_image(doc, xref, size)
+            if image.width > size[0] * DPI_TOLERANCE:
+                # JPEG draft scaling lands within a factor of two already
+                image = image.resize(size, Image.LANCZOS, reducing_gap=2.0)
+            out = io.BytesIO()
+            image.save(out, "JPEG", quality=JPEG_QUALITY, optimize=True)
+            image.close()
+            if out.tell() < len(doc.xref_stream_raw(xref) or b""):
+                page.replace_image(xref, stream=out.getvalue())
+                replaced += 1
+    # drop decoded images MuPDF keeps in its cache (up to 256 MB by default)
+    fitz.TOOLS.store_shrink(100)
+    return replaced
+
+
+def build_packet(
+    cover_letter_text: str,
+    cv_text: str,
+    attachments: List[Tuple[str, BinaryIO]],
+    name: str = "",
+    image_dpi: Optional[int] = None,
+) -> Tuple[BinaryIO, int, int]:
+    """
+    Assemble the Bewerbungsmappe: Anschreiben, Lebenslauf, then the
+    attachments in upload order. Returns (file positioned at 0, size, pages);
+    the caller closes the file.
+    """
+    if len(attachments) > PACKET_MAX_ATTACHMENTS:
+        raise PacketTooLarge(f"At most {PACKET_MAX_ATTACHMENTS} attachments are allowed")
+    dpi = DEFAULT_IMAGE_DPI if image_dpi is None else image_dpi
+
+    doc = fitz.open()
+    try:
+        font = fitz.Font("helv")
+        toc = []
+        for title, text in (("Anschreiben", cover_letter_text), ("Lebenslauf", cv_text)):
+            if text and text.strip():
+                heading = f"{title} - {name}" if name else title
+                toc.append([1, title, add_text_document(doc, font, heading, text) + 1])
+        if doc.page_count > PACKET_MAX_PAGES:
+            raise PacketTooLarge(f"Bewerbungsmappe would exceed {PACKET_MAX_PAGES} pages")
+
+        for attachment_name, source in attachments:
+            first = insert_attachment(doc, attachment_name, source)
+            if dpi:
+                # shrink each certificate right away, before the next is loaded
+                downsample_images(doc, first, dpi)
+            toc.append([1, attachment_name, first + 1])
+
+        doc.set_toc(toc)
+        doc.set_metadata({"title": f"Bewerbung {name}".strip(), "author": name, "creator": "Applify"})
+        try:
+            doc.subset_fonts()
+        except Exception as e:
+            # full fonts only cost size
+            print(f"[Packaging] Font subsetting failed: {e}")
+
+        out = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+        # garbage=4 also merges identical objects, e.g. the same font or
+        # letterhead embedded by several certificates
+        doc.save(_PdfSink(out), garbage=4, deflate=True, use_objstms=1)
+        pages = doc.page_count
+    finally:
+        doc.close()
+
+    size = out.tell()
+    out.seek(0)
+    return out, size, pages
+
+
+def iter_file(f: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Stream a file in chunks and close it afterwards.
+    """
+    try:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        f.close()
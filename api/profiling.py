@@ -0,0 +1,169 @@
+# api/profiling.py
+"""
+Opt-in per-request sampling profiler.
+
+Enabled only when APPLIFY_PROFILE_TOKEN or APPLIFY_PROFILE_ALL is set; otherwise
+the middleware is never registered and requests pay nothing.
+  - APPLIFY_PROFILE_TOKEN=<secret>: profile requests sent with
+    "X-Applify-Profile: <secret>"
+  - APPLIFY_PROFILE_ALL=1: profile every /generate-resume request
+
+Stacks are written to APPLIFY_PROFILE_DIR (default "profiles") in collapsed
+format ("frame;frame;frame count" per line), which flamegraph.pl and
+speedscope both open directly.
+
+Threadpool workers are sampled only while they run the profiled request's
+calls, but the event-loop thread is sampled as a whole: async work of
+requests served concurrently shows up in the profile too.
+"""
+import contextvars
+import hmac
+import os
+import sys
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+PROFILE_HEADER = "X-Applify-Profile"
+PROFILE_TOKEN = os.getenv("APPLIFY_PROFILE_TOKEN")
+PROFILE_ALL = os.getenv("APPLIFY_PROFILE_ALL", "0") == "1"
+PROFILE_DIR = Path(os.getenv("APPLIFY_PROFILE_DIR", "profiles"))
+PROFILE_INTERVAL = float(os.getenv("APPLIFY_PROFILE_INTERVAL", 0.001))
+
+_active = contextvars.ContextVar("applify_profiler", default=None)
+
+
+def enabled() -> bool:
+    return bool(PROFILE_TOKEN) or PROFILE_ALL
+
+
+def wants_profile(header_value: Optional[str], path: str) -> bool:
+    if PROFILE_TOKEN and header_value and hmac.compare_digest(header_value, PROFILE_TOKEN):
+        return True
+    return PROFILE_ALL and path == "/generate-resume"
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{Path(code.co_filename).name}:{code.co_name}"
+
+
+def _collapse(frame) -> str:
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of the threads working on one request.
+    The event loop thread is added when the request starts; threadpool
+    workers join via run_profiled() for the duration of their call.
+    """
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._threads = set()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    def add_thread(self, ident: Optional[int] = None):
+        self._threads.add(ident or threading.get_ident())
+
+    def discard_thread(self, ident: Optional[int] = None):
+        self._threads.discard(ident or threading.get_ident())
+
+    def start(self):
+        self._sampler = threading.Thread(target=self._run, name="applify-profiler", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in list(self._threads):
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.samples[_collapse(frame)] += 1
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+    def write(self, label: str, directory: Path = None, path: Optional[Path] = None) -> Path:
+        path = path or profile_path(label, directory)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(self.collapsed() + "\n", encoding="utf-8")
+        return path
+
+
+def profile_path(label: str, directory: Path = None) -> Path:
+    slug = label.strip("/").replace("/", "_") or "root"
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+    return Path(directory or PROFILE_DIR) / f"{stamp}-{slug}-{uuid.uuid4().hex[:8]}.collapsed"
+
+
+def run_profiled(fn, *args, **kwargs):
+    """
+    Call fn, sampling the current thread if the calling request is profiled.
+    Meant for functions handed to the threadpool.
+    """
+    profiler = _active.get()
+    if profiler is None:
+        return fn(*args, **kwargs)
+    profiler.add_thread()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profiler.discard_thread()
+
+
+def _header(scope, name: str) -> Optional[str]:
+    key = name.lower().encode("latin-1")
+    for header, value in scope.get("headers", ()):
+        if header == key:
+            return value.decode("latin-1")
+    return None
+
+
+class ProfileMiddleware:
+    """
+    Plain ASGI middleware; register only when enabled() is true. Requests
+    that do not ask for a profile go straight to the app, unwrapped.
+    The profile covers the whole response, streamed bodies included; its
+    file name is sent in the X-Applify-Profile-File response header.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not wants_profile(_header(scope, PROFILE_HEADER), scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        path = profile_path(scope["path"])
+
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", [])) + [(b"x-applify-profile-file", str(path).encode())]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        profiler = SamplingProfiler()
+        profiler.add_thread()
+        token = _active.set(profiler)
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            profiler.stop()
+            _active.reset(token)
+            profiler.write(scope["path"], path=path)
@@ -0,0 +1,191 @@
+# api/regeneration.py
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+OUTPUT_SECTIONS = (
+    "cv_text",
+    "cover_letter_text",
+    "unterlagen_info",
+    "cv_simple",
+    "cover_letter_simple",
+)
+
+_ALL = set(OUTPUT_SECTIONS)
+_DOCUMENTS = {"cv_text", "cover_letter_text", "cv_simple", "cover_letter_simple"}
+_CV = {"cv_text", "cv_simple"}
+_COVER_LETTER = {"cover_letter_text", "cover_letter_simple"}
+_SIMPLE = {"cv_simple", "cover_letter_simple"}
+
+# Generated sections that depend on each CandidateInput field
+FIELD_SECTIONS: Dict[str, Set[str]] = {
+    "name": _DOCUMENTS,
+    "email": _DOCUMENTS,
+    "phone": _DOCUMENTS,
+    "address": _DOCUMENTS,
+    "birth_date": _CV,
+    "birth_place": _CV,
+    "summary": _DOCUMENTS,
+    "skills": _DOCUMENTS,
+    "experience": _DOCUMENTS,
+    "interests": _CV,
+    "education": _CV,
+    "languages": _CV,
+    "additional_info": _CV,
+    "job_description": _ALL,
+    "include_simple_version": _SIMPLE,
+    "want_pdf": set(),
+}
+
+# Candidate fields that are template variables of german_resume_template.j2,
+# so a change can be patched into cv_data and re-rendered without the LLM
+CV_DATA_FIELDS = {"name", "email", "phone", "address", "birth_date", "birth_place"}
+
+# Candidate fields mapped onto the Anschreiben sender block
+COVER_LETTER_SENDER_FIELDS = {
+    "name": "sender_name",
+    "email": "sender_email",
+    "phone": "sender_phone",
+    "address": "sender_address",
+}
+
+# Anschreiben template variables the user may edit directly (e.g. salutation)
+COVER_LETTER_FIELDS = {
+    "recipient_name",
+    "recipient_address",
+    "place",
+    "date",
+    "subject",
+    "salutation",
+    "body_intro",
+    "body_main",
+    "body_connection",
+    "closing_line",
+    "digital_signature",
+}
+
+EDITABLE_FIELDS = set(FIELD_SECTIONS) | COVER_LETTER_FIELDS
+
+
+def plan_regeneration(
+    changes: Dict[str, Any],
+    previous_output: Dict[str, Any],
+    include_simple: bool = True,
+) -> Tuple[Set[str], Dict[str, Any], Dict[str, Any]]:
+    """
+    Works out what a change to the candidate data invalidates.
+    Returns (sections the LLM must regenerate, cv_data patch, cover_letter_data patch).
+    Changes that map onto structured template data are patched and re-rendered
+    instead of being sent back to the LLM.
+    """
+    has_cv_data = isinstance(previous_output.get("cv_data"), dict)
+    has_cl_data = isinstance(previous_output.get("cover_letter_data"), dict)
+
+    llm_sections: Set[str] = set()
+    cv_patch: Dict[str, Any] = {}
+    cl_patch: Dict[str, Any] = {}
+
+    for field, value in changes.items():
+        if field in COVER_LETTER_FIELDS:
+            if has_cl_data:
+                cl_patch[field] = value
+            else:
+                llm_sections |= _COVER_LETTER
+            continue
+
+        sections = set(FIELD_SECTIONS.get(field, ()))
+        if has_cv_data and field in CV_DATA_FIELDS:
+            cv_patch[field] = value
+            sections.discard("cv_text")
+        if has_cl_data and field in COVER_LETTER_SENDER_FIELDS:
+            cl_patch[COVER_LETTER_SENDER_FIELDS[field]] = value
+            sections.discard("cover_letter_text")
+        llm_sections |= sections
+
+    if not include_simple:
+        llm_sections -= _SIMPLE
+
+    return llm_sections, cv_patch, cl_patch
+
+
+class GenerationStore:
+    """
+    Bounded in-memory store of recent generations, keyed by generation ID.
+    Oldest entries are evicted first once max_entries is reached.
+    """
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._records: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def save(self, record: Dict[str, Any], generation_id: Optional[str] = None) -> str:
+        generation_id = generation_id or uuid.uuid4().hex
+        with self._lock:
+            self._records[generation_id] = record
+            self._records.move_to_end(generation_id)
+            while len(self._records) > self.max_entries:
+                self._records.popitem(last=False)
+        return generation_id
+
+    def get(self, generation_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._records.get(generation_id)
+            if record is not None:
+                self._records.move_to_end(generation_id)
+            return record
+
+
+class SqliteGenerationStore:
+    """
+    GenerationStore backed by one SQLite file, shared by all worker
+    processes: with several workers a follow-up request (regeneration,
+    Bewerbungsmappe) may reach any of them. Least recently used entries are
+    evicted first once max_entries is reached.
+    """
+    def __init__(self, path: str, max_entries: int = 256):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # opened lazily, so every worker process gets its own connection
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS generations "
+                "(id TEXT PRIMARY KEY, record TEXT NOT NULL, used_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS generations_used_at ON generations (used_at)")
+            self._conn = conn
+        return self._conn
+
+    def save(self, record: Dict[str, Any], generation_id: Optional[str] = None) -> str:
+        generation_id = generation_id or uuid.uuid4().hex
+        data = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO generations (id, record, used_at) VALUES (?, ?, ?)",
+                (generation_id, data, time.time()),
+            )
+            conn.execute(
+                "DELETE FROM generations WHERE id NOT IN "
+                "(SELECT id FROM generations ORDER BY used_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+        return generation_id
+
+    def get(self, generation_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT record FROM generations WHERE id = ?", (generation_id,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE generations SET used_at = ? WHERE id = ?", (time.time(), generation_id))
+        return json.loads(row[0])
@@ -1,6 +1,6 @@
 # api/schemas.py
 from pydantic import BaseModel, EmailStr, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Literal, Optional, Dict, Any
 
 
 class ExperienceItem(BaseModel):
@@ -43,3 +43,30 @@ class CandidateInput(BaseModel):
     job_description: str = Field(..., description="Full text of the target job ad")
     include_simple_version: Optional[bool] = False
     want_pdf: Optional[bool] = False
+    generation_mode: Literal["auto", "llm", "template"] = Field(
+        "auto",
+        description="llm: always use the LLM; template: LLM-free rendering from the input data; "
+                    "auto: LLM, falling back to template when providers are down or busy",
+    )
+
+
+class RegenerateRequest(BaseModel):
+    generation_id: str = Field(..., description="generation_id returned by /generate-resume")
+    changes: Dict[str, Any] = Field(
+        default_factory=dict,
+        description="Changed CandidateInput fields (lists replace the whole list) "
+                    "and/or Anschreiben fields such as salutation or subject",
+    )
+
+
+class JobAd(BaseModel):
+    id: Optional[str] = None
+    title: Optional[str] = None
+    text: str = Field(..., description="Full text of the job ad")
+
+
+class MatchRequest(BaseModel):
+    candidate: CandidateInput  # candidate.job_description is ignored here (may be "")
+    jobs: List[JobAd] = Field(..., min_length=1, max_length=2000)
+    top_k: int = Field(10, ge=1, le=2000)
+    generate: bool = Field(False, description="Run /generate-resume for the best match right away")
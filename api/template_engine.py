@@ -0,0 +1,138 @@
+# api/template_engine.py
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+UNTERLAGEN_INFO = (
+    "Eine vollständige Bewerbung besteht aus Anschreiben, tabellarischem Lebenslauf "
+    "und Zeugnissen (Arbeitszeugnisse, Abschlusszeugnisse, Zertifikate). "
+    "Optional: Deckblatt, Anlagenverzeichnis, Arbeitsproben. "
+    "Reihenfolge: Anschreiben, Lebenslauf, Zeugnisse (neueste zuerst). "
+    "Für Online-Bewerbungen alles in einer PDF-Datei zusammenfassen (max. ca. 5 MB)."
+)
+
+DEFAULT_SALUTATION = "Sehr geehrte Damen und Herren,"
+
+
+def _job_title(job_description: str) -> str:
+    # First non-empty line of the ad is usually the position title
+    for line in (job_description or "").splitlines():
+        line = line.strip(" \t-•*#:")
+        if line:
+            return line[:80]
+    return "die ausgeschriebene Position"
+
+
+def _place(address: Optional[str]) -> str:
+    # "Musterstraße 1, 10115 Berlin" -> "Berlin"
+    last = (address or "").replace("\n", ",").split(",")[-1].strip()
+    match = re.match(r"^\d{4,5}\s+(.+)$", last)
+    return match.group(1) if match else last
+
+
+_OPEN_ENDED_RE = re.compile(r"heute|present|aktuell|current", re.IGNORECASE)
+
+
+def _end_sort_key(item: Dict[str, Any]):
+    # Antichronological order; open-ended entries ("heute", "Present", empty) first
+    end_date = (item.get("end_date") or "").strip()
+    if not end_date or _OPEN_ENDED_RE.search(end_date):
+        return (9999, 12)
+    match = re.search(r"(\d{1,2})\s*/\s*(\d{4})", end_date)
+    if match:
+        return (int(match.group(2)), int(match.group(1)))
+    # year only ("2010") counts as the end of that year
+    match = re.search(r"\b(\d{4})\b", end_date)
+    if match:
+        return (int(match.group(1)), 12)
+    # unreadable dates go last rather than above the current position
+    return (0, 0)
+
+
+def _sorted_newest_first(items: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    return sorted(items or [], key=_end_sort_key, reverse=True)
+
+
+def build_cv_data(candidate: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Map CandidateInput fields onto german_resume_template.j2 variables.
+    """
+    return {
+        "name": candidate.get("name", ""),
+        "address": candidate.get("address", ""),
+        "phone": candidate.get("phone", ""),
+        "email": candidate.get("email", ""),
+        "birth_date": candidate.get("birth_date"),
+        "birth_place": candidate.get("birth_place"),
+        "experience": _sorted_newest_first(candidate.get("experience")),
+        "education": _sorted_newest_first(candidate.get("education")),
+        "languages": candidate.get("languages") or [],
+        "skills": candidate.get("skills") or [],
+        "additional_info": candidate.get("additional_info", ""),
+        "place": _place(candidate.get("address")),
+        "date": datetime.now().strftime("%d.%m.%Y"),
+    }
+
+
+def build_cover_letter_data(candidate: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Map CandidateInput fields onto german_cover_letter_template.j2 variables
+    using fixed German phrasing.
+    """
+    job_title = _job_title(candidate.get("job_description", ""))
+    experience = _sorted_newest_first(candidate.get("experience"))
+    skills = candidate.get("skills") or []
+
+    body_intro = (
+        f"mit großem Interesse habe ich Ihre Stellenausschreibung als {job_title} gelesen. "
+        "Die Aufgaben passen sehr gut zu meinen bisherigen Erfahrungen und meinen beruflichen Zielen."
+    )
+
+    main_parts = []
+    if experience:
+        latest = experience[0]
+        main_parts.append(
+            f"Zuletzt war ich als {latest.get('job_title', '')} bei {latest.get('company', '')} tätig."
+        )
+        duties = [d for d in (latest.get("responsibilities") or []) if d][:3]
+        if duties:
+            main_parts.append("Dort gehörten unter anderem folgende Aufgaben zu meinem Bereich: " + "; ".join(duties) + ".")
+    if skills:
+        main_parts.append("Besonders einbringen kann ich meine Kenntnisse in " + ", ".join(skills[:6]) + ".")
+    if candidate.get("summary"):
+        main_parts.append(candidate["summary"].strip())
+
+    return {
+        "sender_name": candidate.get("name", ""),
+        "sender_address": candidate.get("address", ""),
+        "sender_phone": candidate.get("phone", ""),
+        "sender_email": candidate.get("email", ""),
+        "recipient_name": "Personalabteilung",
+        "recipient_address": "",
+        "place": _place(candidate.get("address")),
+        "date": datetime.now().strftime("%d.%m.%Y"),
+        "subject": f"Bewerbung als {job_title}",
+        "salutation": DEFAULT_SALUTATION,
+        "body_intro": body_intro,
+        "body_main": " ".join(main_parts),
+        "body_connection": "Ihr Unternehmen überzeugt mich, und ich möchte mit meinen Fähigkeiten zu Ihrem Erfolg beitragen.",
+        "closing_line": "Über die Einladung zu einem persönlichen Vorstellungsgespräch freue ich mich sehr.",
+        "digital_signature": False,
+    }
+
+
+class TemplateEngine:
+    """
+    Deterministic, LLM-free counterpart of AIEngine.
+    Maps CandidateInput straight to cv_data / cover_letter_data so the
+    templates in format_engine can render a complete result in milliseconds.
+    Used when the LLM providers are unavailable or busy (degraded mode).
+    """
+    def generate_documents(self, candidate_payload: Dict[str, Any], **_ignored) -> Dict[str, Any]:
+        return {
+            "cv_data": build_cv_data(candidate_payload),
+            "cover_letter_data": build_cover_letter_data(candidate_payload),
+            "unterlagen_info": UNTERLAGEN_INFO,
+            "cv_simple": "",
+            "cover_letter_simple": "",
+        }
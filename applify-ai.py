@@ -7,6 +7,10 @@ import os
 import socket
 import argparse
 import threading
+import signal
+import shutil
+import tempfile
+import urllib.request
 
 # -------- COLOR OUTPUT -----------------------------------------
 class Color:
@@ -37,105 +41,329 @@ def ensure_log_dir():
 
 ensure_log_dir()
 
+# -------- READINESS ----------------------------------------------
+def wait_until_ready(url, process, label, timeout=60):
+    """
+    Poll a health/readiness URL until it answers 200, instead of sleeping.
+    """
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            error(f"{label} exited during startup (code {process.returncode}), see logs/")
+            return False
+        try:
+            with urllib.request.urlopen(url, timeout=1) as res:
+                if res.status == 200:
+                    success(f"{label} is ready")
+                    return True
+        except Exception:
+            pass
+        time.sleep(0.2)
+    error(f"{label} not ready after {timeout}s ({url})")
+    return False
+
 # -------- START PROCESSES ----------------------------------------
 def run_backend(port, watch_mode):
-    log_file = open("logs/backend.log", "w")
+    log_file = open("logs/backend.log", "a" if watch_mode else "w")
     success(f"Starting Backend (FastAPI) on port {port}...")
 
+    # no uvicorn --reload in watch mode: the launcher's watcher restarts
+    # the process itself and hot reloads prompt/templates via SIGUSR1
     cmd = [
-        "uvicorn", "api.main:app",
+        "uvicorn", "main:app",
         "--host", "0.0.0.0",
         "--port", str(port)
     ]
 
-    if watch_mode:
-        cmd.append("--reload")
-
     return subprocess.Popen(cmd, stdout=log_file, stderr=log_file)
 
-def run_frontend(port):
+def run_backend_prod(port, workers, ready_dir):
+    log_file = open("logs/backend.log", "w")
+    success(f"Starting Backend (FastAPI, {workers} workers) on port {port}...")
+
+    cmd = [
+        sys.executable, os.path.abspath(__file__), "--serve-backend",
+        "--port", str(port),
+        "--workers", str(workers),
+    ]
+    env = dict(os.environ, APPLIFY_READY_DIR=ready_dir)
+    return subprocess.Popen(cmd, stdout=log_file, stderr=log_file, env=env)
+
+def run_frontend(port, prod=False):
     log_file = open("logs/frontend.log", "w")
     success(f"Starting Frontend (Streamlit) on port {port}...")
 
-    cmd = ["streamlit", "run", "ui/main.py", "--server.port", str(port)]
+    cmd = ["streamlit", "run", "ui.py", "--server.port", str(port)]
+    if prod:
+        cmd += ["--server.headless", "true"]
     return subprocess.Popen(cmd, stdout=log_file, stderr=log_file)
 
+# -------- PROD BACKEND SUPERVISOR -------------------------------
+def serve_backend(port, workers):
+    """
+    Runs inside the backend process started by run_backend_prod.
+    Same as `uvicorn main:app --workers N`, except that SIGHUP does a
+    rolling restart: each replacement worker must have finished warm-up
+    (it drops a <pid> file in APPLIFY_READY_DIR) before the old one stops.
+    """
+    import uvicorn
+    from uvicorn.supervisors import Multiprocess
+    from uvicorn.supervisors.multiprocess import Process
+
+    ready_dir = os.environ["APPLIFY_READY_DIR"]
+    # workers inherit the environment: with more than one, generations must
+    # live in a shared store or follow-up requests 404 on the other workers
+    if workers > 1:
+        os.environ.setdefault("APPLIFY_GENERATION_DB", os.path.join(ready_dir, "generations.sqlite3"))
+
+    class RollingMultiprocess(Multiprocess):
+        def restart_all(self):
+            for idx, old in enumerate(list(self.processes)):
+                new = Process(self.config, self.target, self.sockets)
+                new.start()
+                ready_file = os.path.join(ready_dir, str(new.pid))
+                deadline = time.time() + 60
+                while not os.path.exists(ready_file):
+                    if not new.process.is_alive() or time.time() > deadline:
+                        print(f"Replacement worker [{new.pid}] failed to start, keeping [{old.pid}]", flush=True)
+                        new.kill()
+                        new.join()
+                        break
+                    time.sleep(0.1)
+                else:
+                    old.terminate()
+                    old.join()
+                    self.processes[idx] = new
+
+    config = uvicorn.Config("main:app", host="0.0.0.0", port=port, workers=workers)
+    sock = config.bind_socket()
+    server = uvicorn.Server(config=config)
+    RollingMultiprocess(config, target=server.run, sockets=[sock]).run()
+
 # -------- WATCH MODE (AUTO RESTART) ------------------------------
-def watch_and_restart(cmd, label):
+WATCH_EXTENSIONS = (".py", ".txt", ".j2", ".toml", ".env")
+IGNORE_DIRS = {
+    ".git", ".venv", "venv", "env", "__pycache__", ".pytest_cache", ".mypy_cache",
+    ".ruff_cache", "node_modules", "logs", "data", "profiles", "cassettes",
+}
+# prompt and templates are hot reloaded inside the backend, no restart
+ASSET_PREFIXES = ("api/prompts/", "api/template/")
+FRONTEND_PATHS = ("ui.py", "app/", ".streamlit/")
+# hidden directories are skipped by the watcher, except these
+WATCH_HIDDEN_DIRS = {".streamlit"}
+
+def classify_change(rel_path):
     """
-    Simple file watcher using mtime to restart on changes.
+    Map a changed file to what has to happen: "assets" (hot reload),
+    "frontend" / "backend" (restart that service) or None (ignore).
     """
-    import time
+    rel_path = rel_path.replace(os.sep, "/")
+    parts = rel_path.split("/")
+    name = parts[-1]
+    if any(p in IGNORE_DIRS for p in parts[:-1]):
+        return None
+    if name.startswith(".#") or name.endswith(("~", ".swp", ".tmp")) or not name.endswith(WATCH_EXTENSIONS):
+        return None
+    if rel_path.startswith(ASSET_PREFIXES):
+        return "assets"
+    if rel_path.startswith(FRONTEND_PATHS):
+        return "frontend"
+    return "backend"
 
-    last_mtimes = {}
+def start_watcher(root, debounce=0.3):
+    """
+    inotify-based (via watchdog) file watcher. Ignored directories such as
+    .venv and logs/ are never subscribed to. Returns a blocking function that
+    waits for the next burst of changes and returns the set of change kinds
+    once no new event has arrived for `debounce` seconds.
+    """
+    try:
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+    except ImportError:
+        error("--watch needs the 'watchdog' package: pip install watchdog")
+        sys.exit(1)
 
-    while True:
-        time.sleep(1)
-        changed = False
-
-        for root, _, files in os.walk("."):
-            for f in files:
-                if f.endswith((".py", ".txt")):
-                    path = os.path.join(root, f)
-                    try:
-                        mtime = os.path.getmtime(path)
-                    except:
-                        continue
-                    if path not in last_mtimes:
-                        last_mtimes[path] = mtime
-                    elif last_mtimes[path] != mtime:
-                        changed = True
-                        last_mtimes[path] = mtime
-
-        if changed:
-            warn(f"Detected code change → restarting {label}...")
-            return True
+    root = os.path.abspath(root)
+    pending = set()
+    last_event = [0.0]
+    cond = threading.Condition()
+
+    def watchable(name):
+        hidden = name.startswith(".") and name not in WATCH_HIDDEN_DIRS
+        return name not in IGNORE_DIRS and not hidden
+
+    def report(paths):
+        kinds = {classify_change(os.path.relpath(p, root)) for p in paths if p} - {None}
+        if kinds:
+            with cond:
+                pending.update(kinds)
+                last_event[0] = time.monotonic()
+                cond.notify()
+
+    class Handler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            if event.is_directory:
+                # e.g. .streamlit/ created after start: subscribe to it and
+                # pick up files written before the subscription took effect
+                path = event.src_path
+                if (event.event_type == "created" and os.path.dirname(path) == root
+                        and watchable(os.path.basename(path))):
+                    observer.schedule(handler, path, recursive=True)
+                    report(os.path.join(d, f) for d, _, files in os.walk(path) for f in files)
+                return
+            if event.event_type in ("created", "modified", "moved", "deleted"):
+                report((event.src_path, getattr(event, "dest_path", "")))
+
+    handler = Handler()
+    observer = Observer()
+    observer.schedule(handler, root, recursive=False)
+    for entry in os.scandir(root):
+        if entry.is_dir() and watchable(entry.name):
+            observer.schedule(handler, entry.path, recursive=True)
+    observer.daemon = True
+    observer.start()
+
+    def wait_for_changes():
+        with cond:
+            while True:
+                if not pending:
+                    cond.wait()
+                    continue
+                remaining = last_event[0] + debounce - time.monotonic()
+                if remaining <= 0:
+                    kinds = set(pending)
+                    pending.clear()
+                    return kinds
+                cond.wait(remaining)
+
+    return wait_for_changes
+
+def restart(process, start, url, label):
+    warn(f"Detected code change → restarting {label}...")
+    process.terminate()
+    process.wait()
+    process = start()
+    wait_until_ready(url, process, label)
+    return process
+
+def watch_and_restart(backend, frontend, backend_port, frontend_port):
+    """
+    Restart only the service whose files changed; hot reload prompt/templates.
+    """
+    wait_for_changes = start_watcher(".")
+    backend_ready = f"http://127.0.0.1:{backend_port}/ready"
+    frontend_ready = f"http://127.0.0.1:{frontend_port}/_stcore/health"
+    try:
+        while True:
+            kinds = wait_for_changes()
+            if "backend" in kinds:
+                backend = restart(backend, lambda: run_backend(backend_port, True), backend_ready, "Backend")
+            elif "assets" in kinds:
+                backend.send_signal(signal.SIGUSR1)
+                success("Prompt/templates changed → hot reloaded in backend (no restart)")
+            if "frontend" in kinds:
+                frontend = restart(frontend, lambda: run_frontend(frontend_port), frontend_ready, "Frontend")
+    except KeyboardInterrupt:
+        warn("Shutting down...")
+        backend.terminate()
+        frontend.terminate()
+
+# -------- PROD MODE ----------------------------------------------
+def run_prod(backend_port, frontend_port, workers):
+    # holds readiness markers and generations.sqlite3 (candidate data), so
+    # it is removed on every exit path
+    ready_dir = tempfile.mkdtemp(prefix="applify-ready-")
+    try:
+        _run_prod(backend_port, frontend_port, workers, ready_dir)
+    finally:
+        shutil.rmtree(ready_dir, ignore_errors=True)
+
+def _run_prod(backend_port, frontend_port, workers, ready_dir):
+    backend = run_backend_prod(backend_port, workers, ready_dir)
+    if not wait_until_ready(f"http://127.0.0.1:{backend_port}/ready", backend, "Backend"):
+        backend.terminate()
+        backend.wait()
+        sys.exit(1)
+
+    frontend = run_frontend(frontend_port, prod=True)
+    wait_until_ready(f"http://127.0.0.1:{frontend_port}/_stcore/health", frontend, "Frontend")
+
+    success(f"Applify is running in production mode ({workers} backend workers)")
+    info(f"Backend:  http://localhost:{backend_port}/docs")
+    info(f"Frontend: http://localhost:{frontend_port}")
+    info(f"Rolling restart of backend workers: kill -HUP {os.getpid()}")
+
+    # forward SIGHUP to the backend supervisor, which restarts worker by worker
+    signal.signal(signal.SIGHUP, lambda *_: backend.send_signal(signal.SIGHUP))
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+    while not stop.wait(1):
+        if backend.poll() is not None or frontend.poll() is not None:
+            error("A service exited unexpectedly, see logs/")
+            break
+
+    warn("Shutting down...")
+    backend.terminate()
+    frontend.terminate()
+    backend.wait()
+    frontend.wait()
 
 # -------- MAIN ----------------------------------------------------
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--watch", action="store_true",
                         help="Enable auto-restart on file changes")
+    parser.add_argument("--prod", action="store_true",
+                        help="Production mode: multiple pre-warmed backend workers, rolling restarts on SIGHUP")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Number of backend worker processes in --prod mode (default: CPU count); "
+                             "APPLIFY_MAX_CONCURRENT_LLM applies per worker")
+    parser.add_argument("--port", type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--serve-backend", action="store_true", help=argparse.SUPPRESS)
     args = parser.parse_args()
 
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
+    if args.serve_backend:
+        sys.path.insert(0, os.getcwd())
+        serve_backend(args.port, args.workers)
+        return
+
     backend_port = find_free_port(8000)
     frontend_port = find_free_port(8501)
 
-    while True:
-        backend = run_backend(backend_port, args.watch)
-        time.sleep(2)
+    if args.prod:
+        if args.watch:
+            warn("--watch is ignored in --prod mode")
+        run_prod(backend_port, frontend_port, args.workers)
+        return
 
-        frontend = run_frontend(frontend_port)
-        time.sleep(2)
+    backend = run_backend(backend_port, args.watch)
+    wait_until_ready(f"http://127.0.0.1:{backend_port}/ready", backend, "Backend")
 
-        webbrowser.open(f"http://localhost:{frontend_port}")
+    frontend = run_frontend(frontend_port)
+    wait_until_ready(f"http://127.0.0.1:{frontend_port}/_stcore/health", frontend, "Frontend")
 
-        success("Applify is running!")
-        info(f"Backend:  http://localhost:{backend_port}/docs")
-        info(f"Frontend: http://localhost:{frontend_port}")
+    webbrowser.open(f"http://localhost:{frontend_port}")
 
-        if args.watch:
-            restarted_backend = watch_and_restart("backend", "backend/frontend")
-
-            if restarted_backend:
-                warn("Restarting both services...")
-                backend.terminate()
-                frontend.terminate()
-                time.sleep(1)
-                continue
-        else:
-            try:
-                backend.wait()
-                frontend.wait()
-            except KeyboardInterrupt:
-                warn("Shutting down...")
-                backend.terminate()
-                frontend.terminate()
-                sys.exit(0)
-
-        break
+    success("Applify is running!")
+    info(f"Backend:  http://localhost:{backend_port}/docs")
+    info(f"Frontend: http://localhost:{frontend_port}")
+
+    if args.watch:
+        watch_and_restart(backend, frontend, backend_port, frontend_port)
+    else:
+        try:
+            backend.wait()
+            frontend.wait()
+        except KeyboardInterrupt:
+            warn("Shutting down...")
+            backend.terminate()
+            frontend.terminate()
+            sys.exit(0)
 
 if __name__ == "__main__":
     main()
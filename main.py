@@ -1,17 +1,60 @@
 # api/main.py
+import asyncio
 import os
+import base64
+import signal
+import threading
 import uvicorn
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from pathlib import Path
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Any, Dict
-from api.schemas import CandidateInput
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from api.schemas import CandidateInput, MatchRequest, RegenerateRequest
 from api.ai_engine import AIEngine
-from api.format_engine import render_cv_text, render_cover_letter_text
+from api.template_engine import TemplateEngine
+from api.matching import rank_jobs
+from api.packaging import PacketError, PacketTooLarge, build_packet, iter_file, packet_filename
+from api.profiling import ProfileMiddleware, enabled as profiling_enabled, run_profiled
+from api.regeneration import (
+    COVER_LETTER_FIELDS,
+    EDITABLE_FIELDS,
+    OUTPUT_SECTIONS,
+    GenerationStore,
+    SqliteGenerationStore,
+    plan_regeneration,
+)
+from api.format_engine import render_cv_text, render_cover_letter_text, warm_templates, clear_template_cache
 from api.utils import create_pdf_from_text, create_docx_from_text
+from services.cassette import CassetteMiss
+from services.llm_service import providers_available, warm_providers
 from datetime import datetime
 from dotenv import load_dotenv
 load_dotenv()
-app = FastAPI(title="Applify Backend", version="1.0")
+
+# set by the --prod launcher; each worker drops a <pid> file here once warm
+READY_DIR = os.getenv("APPLIFY_READY_DIR")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # uvicorn only starts accepting connections after this startup part
+    warm_up()
+    app.state.ready = True
+    ready_file = Path(READY_DIR) / str(os.getpid()) if READY_DIR else None
+    if ready_file:
+        ready_file.touch()
+    yield
+    app.state.ready = False
+    if ready_file:
+        ready_file.unlink(missing_ok=True)
+
+
+app = FastAPI(title="Applify Backend", version="1.0", lifespan=lifespan)
+app.state.ready = False
 
 app.add_middleware(
     CORSMiddleware,
@@ -21,27 +64,93 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# per-request profiling, only registered when configured (zero cost otherwise)
+if profiling_enabled():
+    app.add_middleware(ProfileMiddleware)
+
 # instantiate AI engine
 #ai = AIEngine(model=os.getenv("APPLIFY_MODEL"))
 ai = AIEngine()
+template_engine = TemplateEngine()
 
-@app.post("/generate-resume", response_model=Dict[str, Any])
-async def generate_resume(candidate: CandidateInput):
+# admission limit for concurrent LLM generations, per worker process (N
+# workers allow N x APPLIFY_MAX_CONCURRENT_LLM in total); in auto mode requests
+# over the limit are served by the template engine instead of queueing. Waiting
+# happens on the event loop: a waiter parked in the threadpool would take the
+# thread a slot holder needs to finish, and enough of them deadlock the server.
+llm_slots = asyncio.Semaphore(int(os.getenv("APPLIFY_MAX_CONCURRENT_LLM", 8)))
+
+# recent generations, for section-level regeneration and the Bewerbungsmappe;
+# several workers (--prod) must share them through APPLIFY_GENERATION_DB
+GENERATION_DB = os.getenv("APPLIFY_GENERATION_DB")
+GENERATION_CACHE_SIZE = int(os.getenv("APPLIFY_GENERATION_CACHE_SIZE", 256))
+generations = (
+    SqliteGenerationStore(GENERATION_DB, max_entries=GENERATION_CACHE_SIZE) if GENERATION_DB
+    else GenerationStore(max_entries=GENERATION_CACHE_SIZE)
+)
+
+# exercised once per worker during warm-up
+WARMUP_CANDIDATE = {
+    "name": "Max Mustermann",
+    "email": "max.mustermann@example.com",
+    "skills": ["Python"],
+    "experience": [{"job_title": "Entwickler", "company": "Beispiel GmbH", "responsibilities": ["APIs"]}],
+    "languages": [{"language": "Deutsch", "level": "C1"}],
+    "job_description": "Entwickler (m/w/d)",
+    "want_pdf": True,
+}
+
+
+def warm_up():
     """
-    Generate CV + Cover Letter + Unterlagen Info
+    Build templates, provider clients and one full template-mode render
+    (validation, Jinja, FPDF, DOCX) so the first real request is not slower.
     """
+    warm_templates()
+    warm_providers()
+    candidate = CandidateInput(**WARMUP_CANDIDATE)
     payload = candidate.model_dump() if hasattr(candidate, "model_dump") else candidate.dict()
-    try:
-        model_out = ai.generate_documents(payload)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    _render_response(template_engine.generate_documents(payload), candidate)
 
-    # Extract expected fields from the model output
+
+def reload_assets(*_):
+    """
+    Re-read the super prompt and templates without restarting the process.
+    Sent as SIGUSR1 by the --watch launcher.
+    """
+    ai.reload_prompt()
+    clear_template_cache()
+    print("[Hot reload] prompt and templates reloaded")
+
+
+if hasattr(signal, "SIGUSR1") and threading.current_thread() is threading.main_thread():
+    signal.signal(signal.SIGUSR1, reload_assets)
+
+
+@app.get("/health")
+async def health():
+    """
+    Liveness: the process is up and serving.
+    """
+    return {"status": "ok", "pid": os.getpid()}
+
+
+@app.get("/ready")
+async def ready():
+    """
+    Readiness: warm-up finished and the worker is not shutting down.
+    """
+    if not app.state.ready:
+        return JSONResponse(status_code=503, content={"status": "starting", "pid": os.getpid()})
+    return {"status": "ready", "pid": os.getpid()}
+
+
+def _document_texts(model_out: Dict[str, Any]) -> Tuple[str, str]:
+    """
+    (cv_text, cover_letter_text), rendered from structured data when the model returned it.
+    """
     cv_text = model_out.get("cv_text", "")
     cover_letter_text = model_out.get("cover_letter_text", "")
-    unterlagen_info = model_out.get("unterlagen_info", "")
-    cv_simple = model_out.get("cv_simple", "")
-    cover_letter_simple = model_out.get("cover_letter_simple", "")
 
     # If model returned structured data for templating, render templates
     try:
@@ -52,8 +161,22 @@ async def generate_resume(candidate: CandidateInput):
     except Exception:
         # if rendering fails, continue: use text fields from model
         pass
+    return cv_text, cover_letter_text
+
+
+def _render_response(model_out: Dict[str, Any], candidate: CandidateInput) -> Dict[str, Any]:
+    """
+    Turn model output (text sections and optional cv_data / cover_letter_data)
+    into the API response, rendering templates and PDF/DOCX where requested.
+    """
+    # Extract expected fields from the model output
+    cv_text, cover_letter_text = _document_texts(model_out)
+    unterlagen_info = model_out.get("unterlagen_info", "")
+    cv_simple = model_out.get("cv_simple", "")
+    cover_letter_simple = model_out.get("cover_letter_simple", "")
 
     response = {
+        "degraded": bool(model_out.get("degraded")),
         "cv_text": cv_text,
         "cover_letter_text": cover_letter_text,
         "unterlagen_info": unterlagen_info,
@@ -61,6 +184,8 @@ async def generate_resume(candidate: CandidateInput):
         "cover_letter_simple": cover_letter_simple,
         "generated_at": datetime.utcnow().isoformat() + "Z"
     }
+    if model_out.get("degraded"):
+        response["degraded_reason"] = model_out.get("degraded_reason", "")
 
     # Optionally return PDF/DOCX if requested by client; to keep payload small we provide endpoints for downloads.
     if candidate.want_pdf:
@@ -68,7 +193,6 @@ async def generate_resume(candidate: CandidateInput):
             pdf_bytes = create_pdf_from_text(f"Lebenslauf - {candidate.name}", cv_text + "\n\n" + cover_letter_text)
             docx_bytes = create_docx_from_text(f"Lebenslauf - {candidate.name}", cv_text + "\n\n" + cover_letter_text)
             # In this simple implementation we return base64 representations (or you can return presigned urls)
-            import base64
             response["pdf_base64"] = base64.b64encode(pdf_bytes).decode("utf-8")
             response["docx_base64"] = base64.b64encode(docx_bytes).decode("utf-8")
         except Exception as e:
@@ -77,5 +201,204 @@ async def generate_resume(candidate: CandidateInput):
 
     return response
 
+
+def _degraded(payload: Dict[str, Any], reason: str) -> Dict[str, Any]:
+    model_out = template_engine.generate_documents(payload)
+    model_out["degraded"] = True
+    model_out["degraded_reason"] = reason
+    return model_out
+
+
+async def _generate(payload: Dict[str, Any], mode: str = "auto", **kwargs) -> Dict[str, Any]:
+    """
+    Run the LLM engine or, in template mode / when the LLM is unavailable in
+    auto mode, the deterministic template engine.
+    """
+    if mode == "template":
+        return _degraded(payload, "template mode requested")
+    if mode == "auto" and not providers_available():
+        return _degraded(payload, "LLM providers unavailable")
+
+    if mode == "auto" and llm_slots.locked():
+        return _degraded(payload, "LLM capacity exhausted")
+    async with llm_slots:
+        try:
+            return await run_in_threadpool(run_profiled, ai.generate_documents, payload, **kwargs)
+        except CassetteMiss as e:
+            # replay runs must not quietly turn into template runs
+            raise HTTPException(status_code=500, detail=str(e))
+        except Exception as e:
+            if mode == "auto" and not kwargs.get("sections"):
+                return _degraded(payload, f"LLM generation failed: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+
+
+async def _run_generation(candidate: CandidateInput) -> Dict[str, Any]:
+    payload = candidate.model_dump() if hasattr(candidate, "model_dump") else candidate.dict()
+    model_out = await _generate(payload, candidate.generation_mode)
+
+    response = _render_response(model_out, candidate)
+
+    # Keep the result so later edits can regenerate only the affected sections
+    response["generation_id"] = generations.save({
+        "candidate": payload,
+        "model_out": model_out,
+        "overrides": {},
+    })
+    return response
+
+
+@app.post("/generate-resume", response_model=Dict[str, Any])
+async def generate_resume(candidate: CandidateInput):
+    """
+    Generate CV + Cover Letter + Unterlagen Info
+    """
+    return await _run_generation(candidate)
+
+
+@app.post("/match", response_model=Dict[str, Any])
+async def match_jobs(request: MatchRequest):
+    """
+    Rank job ads for the candidate with the local skill index (no LLM).
+    The best match comes back as a ready /generate-resume payload, or is
+    generated right away with generate=true.
+    """
+    candidate = request.candidate
+    payload = candidate.model_dump() if hasattr(candidate, "model_dump") else candidate.dict()
+    jobs = [job.model_dump() if hasattr(job, "model_dump") else job.dict() for job in request.jobs]
+    # cold ads cost a tokenizer pass each; keep that off the event loop
+    results = await run_in_threadpool(rank_jobs, payload, jobs, request.top_k)
+
+    best = results[0]
+    best_job = request.jobs[best["position"]]
+    generation_payload = {**payload, "job_description": best_job.text}
+    response = {
+        "results": results,
+        "best_match": best,
+        "generation_payload": generation_payload,
+    }
+    if request.generate:
+        response["generation"] = await _run_generation(CandidateInput(**generation_payload))
+    return response
+
+
+@app.post("/regenerate-sections", response_model=Dict[str, Any])
+async def regenerate_sections(request: RegenerateRequest):
+    """
+    Apply a change to a previous generation and regenerate only the sections
+    that depend on the changed fields. Fields that map onto cv_data /
+    cover_letter_data are re-rendered through the templates without the LLM.
+    """
+    record = generations.get(request.generation_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired generation_id")
+
+    unknown = sorted(set(request.changes) - EDITABLE_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Fields cannot be changed: {', '.join(unknown)}")
+
+    candidate_changes = {k: v for k, v in request.changes.items() if k not in COVER_LETTER_FIELDS}
+    cover_letter_changes = {k: v for k, v in request.changes.items() if k in COVER_LETTER_FIELDS}
+    try:
+        candidate = CandidateInput(**{**record["candidate"], **candidate_changes})
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    payload = candidate.model_dump() if hasattr(candidate, "model_dump") else candidate.dict()
+
+    model_out = dict(record["model_out"])
+    overrides = {**record["overrides"], **cover_letter_changes}
+    llm_sections, cv_patch, cl_patch = plan_regeneration(
+        request.changes, model_out, include_simple=bool(candidate.include_simple_version)
+    )
+
+    rerendered = []
+    if model_out.get("degraded"):
+        # template results are rebuilt completely, through the LLM again as
+        # soon as providers are available (_generate degrades otherwise)
+        model_out = await _generate(payload, candidate.generation_mode, overrides=overrides or None)
+        llm_sections = set()
+        if not model_out.get("degraded"):
+            llm_sections = {
+                s for s in OUTPUT_SECTIONS
+                if candidate.include_simple_version or s not in ("cv_simple", "cover_letter_simple")
+            }
+        # contact fields are already in the rebuilt data, only overrides remain
+        cv_patch, cl_patch = {}, {}
+        if isinstance(model_out.get("cover_letter_data"), dict):
+            model_out["cover_letter_data"].update(overrides)
+        if not llm_sections:
+            rerendered = ["cv_text", "cover_letter_text"]
+    elif llm_sections:
+        sections = [s for s in OUTPUT_SECTIONS if s in llm_sections]
+        fresh = await _generate(payload, candidate.generation_mode, sections=sections, overrides=overrides or None)
+        if fresh.get("degraded"):
+            # saving a template result here would replace the LLM documents for good
+            raise HTTPException(
+                status_code=503,
+                detail=f"Sections cannot be regenerated right now ({fresh.get('degraded_reason', '')}); nothing was changed",
+            )
+        for key in sections:
+            if key in fresh:
+                model_out[key] = fresh[key]
+        for text_key, data_key in (("cv_text", "cv_data"), ("cover_letter_text", "cover_letter_data")):
+            if isinstance(fresh.get(data_key), dict):
+                model_out[data_key] = fresh[data_key]
+            elif text_key in sections:
+                # structured data would win over the fresh text when rendering
+                model_out.pop(data_key, None)
+
+    # without structured data the LLM text already reflects these changes
+    if cv_patch and isinstance(model_out.get("cv_data"), dict):
+        model_out["cv_data"] = {**model_out["cv_data"], **cv_patch}
+        rerendered.append("cv_text")
+    if cl_patch and isinstance(model_out.get("cover_letter_data"), dict):
+        model_out["cover_letter_data"] = {**model_out["cover_letter_data"], **cl_patch}
+        rerendered.append("cover_letter_text")
+
+    response = _render_response(model_out, candidate)
+    response["generation_id"] = generations.save(
+        {"candidate": payload, "model_out": model_out, "overrides": overrides},
+        generation_id=request.generation_id,
+    )
+    response["regenerated_sections"] = sorted(llm_sections)
+    response["rerendered_sections"] = rerendered
+    return response
+
+@app.post("/bewerbungsmappe")
+async def bewerbungsmappe(
+    generation_id: str = Form(..., description="generation_id returned by /generate-resume"),
+    attachments: List[UploadFile] = File(default=[], description="Zeugnisse / certificates as PDF, in order"),
+    image_dpi: Optional[int] = Form(None, ge=0, le=600, description="Downsample scans above this resolution; 0 keeps them"),
+):
+    """
+    Merge Anschreiben, Lebenslauf and the uploaded certificates into one
+    Bewerbungsmappe PDF, streamed back as a download.
+    """
+    record = generations.get(generation_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired generation_id")
+    cv_text, cover_letter_text = _document_texts(record["model_out"])
+    name = record["candidate"].get("name", "")
+
+    sources = [(upload.filename or f"Anlage {i + 1}", upload.file) for i, upload in enumerate(attachments)]
+    try:
+        packet, size, pages = await run_in_threadpool(
+            run_profiled, build_packet, cover_letter_text, cv_text, sources, name, image_dpi
+        )
+    except PacketTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except PacketError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return StreamingResponse(
+        iter_file(packet),
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f'attachment; filename="{packet_filename(name)}"',
+            "Content-Length": str(size),
+            "X-Applify-Packet-Pages": str(pages),
+        },
+    )
+
 if __name__ == "__main__":
     uvicorn.run("api.main:app", host="0.0.0.0", port=int(os.getenv("PORT", 8000)), reload=True)
@@ -0,0 +1,146 @@
+# services/cassette.py
+"""
+Record-and-replay of LLM provider calls.
+
+A cassette is a JSON Lines file with one provider call per line:
+    {"provider", "prompt_sha256", "prompt_chars", "ok", "response",
+     "latency_s", "chunks": [[offset_s, text], ...], "recorded_at"}
+
+Prompts are stored only as hashes; responses still contain candidate PII,
+so treat cassettes like any other personal data.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+class CassetteMiss(LookupError):
+    """A replayed prompt has no recorded episode."""
+
+
+class CassetteRecorder:
+    """
+    Appends every provider call (including failed ones) to a cassette file.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        provider: str,
+        prompt: str,
+        response: Optional[str],
+        latency_s: float,
+        chunks: Optional[List[Tuple[float, str]]] = None,
+    ):
+        if chunks is None:
+            # non-streaming providers deliver everything at once
+            chunks = [(latency_s, response)] if response else []
+        entry = {
+            "provider": provider,
+            "prompt_sha256": prompt_hash(prompt),
+            "prompt_chars": len(prompt),
+            "ok": bool(response),
+            "response": response,
+            "latency_s": round(latency_s, 6),
+            "chunks": [[round(offset, 6), text] for offset, text in chunks],
+            "recorded_at": datetime.utcnow().isoformat() + "Z",
+        }
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class CassettePlayer:
+    """
+    Serves recorded responses offline.
+
+    Calls are grouped into episodes: the failed attempts for a prompt followed
+    by the call that succeeded, i.e. one hybrid_llm() round trip. Replaying an
+    episode reproduces its total latency, including the time spent on failing
+    providers, and the chunk timing of the successful response.
+
+    match="prompt" serves episodes recorded for the same prompt;
+    match="sequence" serves episodes in recorded order regardless of prompt,
+    useful for profiling with different candidate data.
+    Repeated prompts cycle through their recorded episodes.
+    """
+    def __init__(self, path, realtime: bool = False, match: str = "prompt"):
+        if match not in ("prompt", "sequence"):
+            raise ValueError(f"Unknown cassette match mode: {match}")
+        self.realtime = realtime
+        self.match = match
+        self._episodes: Dict[str, List[Dict]] = defaultdict(list)
+        self._sequence: List[Dict] = []
+        self._cursor: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self._load(Path(path))
+
+    def _load(self, path: Path):
+        pending: Dict[str, float] = defaultdict(float)  # latency of failed attempts so far
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                key = entry["prompt_sha256"]
+                if not entry.get("ok"):
+                    pending[key] += entry.get("latency_s", 0.0)
+                    continue
+                lead = pending.pop(key, 0.0)
+                episode = {
+                    "response": entry["response"],
+                    "latency_s": lead + entry.get("latency_s", 0.0),
+                    "chunks": [(lead + offset, text) for offset, text in entry.get("chunks") or []],
+                }
+                self._episodes[key].append(episode)
+                self._sequence.append(episode)
+
+    def __len__(self):
+        return len(self._sequence)
+
+    def _next_episode(self, prompt: str) -> Optional[Dict]:
+        if self.match == "sequence":
+            key, episodes = "*", self._sequence
+        else:
+            key = prompt_hash(prompt)
+            episodes = self._episodes.get(key)
+        if not episodes:
+            return None
+        with self._lock:
+            episode = episodes[self._cursor[key] % len(episodes)]
+            self._cursor[key] += 1
+        return episode
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """
+        Yield the recorded chunks; with realtime=True each chunk arrives at its
+        recorded offset from the start of the call.
+        """
+        episode = self._next_episode(prompt)
+        if episode is None:
+            return
+        chunks = episode["chunks"] or [(episode["latency_s"], episode["response"])]
+        start = time.monotonic()
+        for offset, text in chunks:
+            if self.realtime:
+                delay = offset - (time.monotonic() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            yield text
+
+    def play(self, prompt: str) -> Optional[str]:
+        text = "".join(self.stream(prompt))
+        return text or None
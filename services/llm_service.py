@@ -1,25 +1,82 @@
 import google.generativeai as genai
 from openai import OpenAI
 import os
+import threading
+import time
+from functools import lru_cache
 from dotenv import load_dotenv
 
+from services.cassette import CassetteMiss, CassettePlayer, CassetteRecorder, prompt_hash
+
 load_dotenv()
 
 GEMINI_KEY = os.getenv("GEMINI_API_KEY")
 DEEPSEEK_KEY = os.getenv("DEEPSEEK_API_KEY")
 OPENAI_KEY = os.getenv("OPENAI_API_KEY")
 
+# Circuit breaker: after BREAKER_THRESHOLD consecutive failures a provider
+# is skipped for BREAKER_COOLDOWN seconds instead of being waited on again
+BREAKER_THRESHOLD = int(os.getenv("APPLIFY_BREAKER_THRESHOLD", 3))
+BREAKER_COOLDOWN = float(os.getenv("APPLIFY_BREAKER_COOLDOWN", 60))
+
+# Record-and-replay: APPLIFY_LLM_RECORD=<file> appends every provider call to
+# a cassette; APPLIFY_LLM_REPLAY=<file> serves cassette responses offline
+# instead of calling any provider (APPLIFY_LLM_REPLAY_REALTIME=1 reproduces
+# the recorded latency and chunk timing)
+RECORD_PATH = os.getenv("APPLIFY_LLM_RECORD")
+REPLAY_PATH = os.getenv("APPLIFY_LLM_REPLAY")
+
+recorder = CassetteRecorder(RECORD_PATH) if RECORD_PATH else None
+player = CassettePlayer(
+    REPLAY_PATH,
+    realtime=os.getenv("APPLIFY_LLM_REPLAY_REALTIME", "0") == "1",
+    match=os.getenv("APPLIFY_LLM_REPLAY_MATCH", "prompt"),
+) if REPLAY_PATH else None
+
 # Configure Gemini
 if GEMINI_KEY:
     genai.configure(api_key=GEMINI_KEY)
 
 
+# ----------------------------------------------------
+# CLIENTS (built once per process and reused, keeps connections pooled)
+# ----------------------------------------------------
+@lru_cache(maxsize=None)
+def gemini_model():
+    return genai.GenerativeModel("gemini-2.0-flash")
+
+
+@lru_cache(maxsize=None)
+def deepseek_client():
+    return OpenAI(api_key=DEEPSEEK_KEY, base_url="https://api.deepseek.com")
+
+
+@lru_cache(maxsize=None)
+def openai_client():
+    return OpenAI(api_key=OPENAI_KEY)
+
+
+def warm_providers():
+    """
+    Build the clients of all configured providers up front, so the first
+    request does not pay for it. Makes no network calls.
+    """
+    for key, build in ((GEMINI_KEY, gemini_model), (DEEPSEEK_KEY, deepseek_client), (OPENAI_KEY, openai_client)):
+        if not key:
+            continue
+        try:
+            build()
+        except Exception as e:
+            # the provider call will fail (and trip its breaker) instead
+            print(f"[Warm-up failed] {build.__name__}:", e)
+
+
 # ----------------------------------------------------
 # GEMINI (primary)
 # ----------------------------------------------------
 def call_gemini(prompt: str):
     try:
-        model = genai.GenerativeModel("gemini-2.0-flash")
+        model = gemini_model()
         response = model.generate_content(prompt)
         return response.text
     except Exception as e:
@@ -32,15 +89,11 @@ def call_gemini(prompt: str):
 # ----------------------------------------------------
 def call_deepseek(prompt: str):
     try:
-        client = OpenAI(
-            api_key=DEEPSEEK_KEY,
-            base_url="https://api.deepseek.com"
-        )
-        res = client.chat.completions.create(
+        res = deepseek_client().chat.completions.create(
             model="deepseek-chat",
             messages=[{"role": "user", "content": prompt}]
         )
-        return res.choices[0].message["content"]
+        return res.choices[0].message.content
     except Exception as e:
         print("[DeepSeek failed]:", e)
         return None
@@ -51,36 +104,91 @@ def call_deepseek(prompt: str):
 # ----------------------------------------------------
 def call_openai(prompt: str):
     try:
-        client = OpenAI(api_key=OPENAI_KEY)
-        res = client.chat.completions.create(
+        res = openai_client().chat.completions.create(
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt}]
         )
-        return res.choices[0].message["content"]
+        return res.choices[0].message.content
     except Exception as e:
         print("[OpenAI failed]:", e)
         return None
 
 
 # ----------------------------------------------------
-# MASTER fallback engine
+# REPLAY (offline, from a recorded cassette)
 # ----------------------------------------------------
-def hybrid_llm(prompt: str):
-    # Try Gemini
-    if GEMINI_KEY:
-        response = call_gemini(prompt)
-        if response:
-            return response
+def call_replay(prompt: str):
+    response = player.play(prompt)
+    if response is None:
+        # fail loudly: falling back would silently measure something else
+        raise CassetteMiss(f"No cassette entry for prompt sha256={prompt_hash(prompt)} in {REPLAY_PATH}")
+    return response
+
+
+# ----------------------------------------------------
+# CIRCUIT BREAKERS
+# ----------------------------------------------------
+_breakers = {}  # provider -> {"failures": int, "opened_at": float}
+_breaker_lock = threading.Lock()
+
+
+def breaker_open(provider: str) -> bool:
+    with _breaker_lock:
+        state = _breakers.get(provider)
+        if not state or state["failures"] < BREAKER_THRESHOLD:
+            return False
+        # half-open after the cooldown: let one more attempt through
+        return time.monotonic() - state["opened_at"] < BREAKER_COOLDOWN
+
+
+def record_result(provider: str, ok: bool):
+    with _breaker_lock:
+        if ok:
+            _breakers.pop(provider, None)
+            return
+        state = _breakers.setdefault(provider, {"failures": 0, "opened_at": 0.0})
+        state["failures"] += 1
+        if state["failures"] >= BREAKER_THRESHOLD:
+            state["opened_at"] = time.monotonic()
 
-    # Then DeepSeek
-    if DEEPSEEK_KEY:
-        response = call_deepseek(prompt)
-        if response:
-            return response
 
-    # Then OpenAI
+def configured_providers():
+    if player is not None:
+        return [("replay", call_replay)]
+    providers = []
+    if GEMINI_KEY:
+        providers.append(("gemini", call_gemini))
+    if DEEPSEEK_KEY:
+        providers.append(("deepseek", call_deepseek))
     if OPENAI_KEY:
-        response = call_openai(prompt)
+        providers.append(("openai", call_openai))
+    return providers
+
+
+def providers_available() -> bool:
+    """
+    True if at least one configured provider has a closed breaker.
+    """
+    return any(not breaker_open(name) for name, _ in configured_providers())
+
+
+# ----------------------------------------------------
+# MASTER fallback engine
+# ----------------------------------------------------
+def hybrid_llm(prompt: str):
+    # Gemini → DeepSeek → OpenAI, skipping providers whose breaker is open
+    for name, call in configured_providers():
+        if name == "replay":
+            # a cassette miss is a setup error, not provider health: raises
+            # CassetteMiss and never counts against a breaker
+            return call(prompt)
+        if breaker_open(name):
+            continue
+        start = time.perf_counter()
+        response = call(prompt)
+        if recorder is not None:
+            recorder.record(name, prompt, response, time.perf_counter() - start)
+        record_result(name, bool(response))
         if response:
             return response
 
@@ -0,0 +1,161 @@
+# tests/test_endpoints.py
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import anyio
+import httpx
+from fastapi.testclient import TestClient
+
+# Add repo root to Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+import main
+
+CANDIDATE = {
+    "name": "Max Mustermann",
+    "email": "max.mustermann@example.com",
+    "address": "Musterstraße 1, 10115 Berlin",
+    "skills": ["Python", "FastAPI"],
+    "job_description": "Backend Entwickler (m/w/d)",
+    "generation_mode": "template",
+}
+
+
+def test_ready_only_after_warm_up():
+    assert TestClient(main.app).get("/ready").status_code == 503
+
+    with TestClient(main.app) as client:  # runs the lifespan warm-up
+        assert client.get("/health").json()["status"] == "ok"
+        assert client.get("/ready").status_code == 200
+
+
+def test_template_mode_is_marked_degraded():
+    client = TestClient(main.app)
+    out = client.post("/generate-resume", json=CANDIDATE).json()
+
+    assert out["degraded"] is True
+    assert "Max Mustermann" in out["cv_text"]
+    assert "Betreff: Bewerbung als Backend Entwickler (m/w/d)" in out["cover_letter_text"]
+
+
+def test_regenerate_sections_patches_salutation():
+    client = TestClient(main.app)
+    first = client.post("/generate-resume", json=CANDIDATE).json()
+
+    out = client.post("/regenerate-sections", json={
+        "generation_id": first["generation_id"],
+        "changes": {"salutation": "Sehr geehrte Frau Schmidt,"},
+    }).json()
+
+    assert "Sehr geehrte Frau Schmidt," in out["cover_letter_text"]
+    assert out["regenerated_sections"] == []
+
+    unknown = client.post("/regenerate-sections", json={"generation_id": "missing", "changes": {}})
+    assert unknown.status_code == 404
+
+
+def test_llm_mode_waits_for_a_slot_without_holding_a_thread(monkeypatch):
+    structured = main.template_engine.generate_documents(CANDIDATE)
+
+    def slow_llm(payload, **kwargs):
+        time.sleep(0.05)
+        return structured
+
+    monkeypatch.setattr(main.ai, "generate_documents", slow_llm)
+    monkeypatch.setattr(main, "llm_slots", asyncio.Semaphore(1))
+    candidate = {**CANDIDATE, "generation_mode": "llm", "want_pdf": False}
+
+    async def run():
+        # fewer threads than waiting requests: waiters must not sit in the pool
+        anyio.to_thread.current_default_thread_limiter().total_tokens = 3
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            requests = [client.post("/generate-resume", json=candidate) for _ in range(6)]
+            return await asyncio.wait_for(asyncio.gather(*requests), timeout=5)
+
+    responses = asyncio.run(run())
+    assert [r.status_code for r in responses] == [200] * 6
+    assert not any(r.json()["degraded"] for r in responses)
+
+
+def test_regenerate_sections_keeps_fresh_llm_text(monkeypatch):
+    structured = main.template_engine.generate_documents(CANDIDATE)
+    calls = []
+
+    def fake_llm(payload, max_tokens=None, sections=None, overrides=None):
+        calls.append(sections)
+        if sections is None:
+            return {**structured, "cv_text": "", "cover_letter_text": ""}
+        return {"cv_text": "Lebenslauf (neu): Deutsch C1"}  # text only, no cv_data
+
+    monkeypatch.setattr(main.ai, "generate_documents", fake_llm)
+    client = TestClient(main.app)
+    first = client.post("/generate-resume", json={**CANDIDATE, "generation_mode": "llm", "want_pdf": False}).json()
+    assert first["degraded"] is False
+
+    out = client.post("/regenerate-sections", json={
+        "generation_id": first["generation_id"],
+        "changes": {"languages": [{"language": "Deutsch", "level": "C1"}]},
+    }).json()
+
+    assert calls == [None, ["cv_text"]]
+    assert out["regenerated_sections"] == ["cv_text"]
+    assert out["cv_text"] == "Lebenslauf (neu): Deutsch C1"
+    assert out["cover_letter_text"] == first["cover_letter_text"]
+
+
+def test_bewerbungsmappe_streams_one_pdf():
+    import fitz
+
+    client = TestClient(main.app)
+    first = client.post("/generate-resume", json=CANDIDATE).json()
+    certificate = fitz.open()
+    certificate.new_page().insert_text((72, 72), "Arbeitszeugnis")
+
+    response = client.post(
+        "/bewerbungsmappe",
+        data={"generation_id": first["generation_id"]},
+        files=[("attachments", ("Zeugnis.pdf", certificate.tobytes(), "application/pdf"))],
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/pdf"
+    assert 'filename="Bewerbungsmappe_Max_Mustermann.pdf"' in response.headers["content-disposition"]
+    packet = fitz.open("pdf", response.content)
+    assert [entry[1] for entry in packet.get_toc()] == ["Anschreiben", "Lebenslauf", "Zeugnis.pdf"]
+    assert "Arbeitszeugnis" in packet[-1].get_text()
+
+    bad = client.post(
+        "/bewerbungsmappe",
+        data={"generation_id": first["generation_id"]},
+        files=[("attachments", ("Zeugnis.pdf", b"not a pdf", "application/pdf"))],
+    )
+    assert bad.status_code == 400
+
+
+def test_regeneration_never_degrades_an_llm_result(monkeypatch):
+    structured = main.template_engine.generate_documents(CANDIDATE)
+    monkeypatch.setattr(main.ai, "generate_documents", lambda payload, **kwargs: dict(structured))
+    monkeypatch.setattr(main, "providers_available", lambda: False)
+    client = TestClient(main.app)
+    first = client.post("/generate-resume", json={**CANDIDATE, "generation_mode": "auto", "want_pdf": False}).json()
+    assert first["degraded"] is True
+
+    # providers are back: the next edit upgrades the template result
+    monkeypatch.setattr(main, "providers_available", lambda: True)
+    salutation = {"salutation": "Sehr geehrte Frau Schmidt,"}
+    upgraded = client.post("/regenerate-sections", json={"generation_id": first["generation_id"], "changes": salutation}).json()
+    assert upgraded["degraded"] is False
+    assert "cv_text" in upgraded["regenerated_sections"]
+    assert "Sehr geehrte Frau Schmidt," in upgraded["cover_letter_text"]
+
+    # no capacity: refuse instead of overwriting the LLM result with a template one
+    monkeypatch.setattr(main, "llm_slots", asyncio.Semaphore(0))
+    busy = client.post("/regenerate-sections", json={
+        "generation_id": first["generation_id"],
+        "changes": {"languages": [{"language": "Deutsch", "level": "C1"}]},
+    })
+    assert busy.status_code == 503
+    assert main.generations.get(first["generation_id"])["model_out"].get("degraded") is not True
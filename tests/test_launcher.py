@@ -0,0 +1,30 @@
+# tests/test_launcher.py
+
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+# applify-ai.py is a script (hyphenated name), load it by path
+ROOT = Path(__file__).resolve().parent.parent
+spec = importlib.util.spec_from_file_location("applify_launcher", ROOT / "applify-ai.py")
+launcher = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(launcher)
+
+
+@pytest.mark.parametrize("path, kind", [
+    (".venv/lib/python3.12/site-packages/x.py", None),
+    ("logs/backend.txt", None),
+    ("api/main.py.swp", None),
+    ("api/.#foo.py", None),
+    (".#foo.py", None),
+    ("api/prompts/applify_super_prompt.txt", "assets"),
+    ("api/template/x.j2", "assets"),
+    ("api/template_engine.py", "backend"),
+    ("main.py", "backend"),
+    ("ui.py", "frontend"),
+    ("app/helpers.py", "frontend"),
+    (".streamlit/config.toml", "frontend"),
+])
+def test_classify_change(path, kind):
+    assert launcher.classify_change(path) == kind
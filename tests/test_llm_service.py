@@ -0,0 +1,93 @@
+# tests/test_llm_service.py
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add repo root to Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from services import llm_service
+from services.cassette import CassetteMiss, prompt_hash
+
+
+@pytest.fixture(autouse=True)
+def reset_breakers():
+    llm_service._breakers.clear()
+    yield
+    llm_service._breakers.clear()
+
+
+def test_breaker_skips_failing_provider(monkeypatch):
+    calls = []
+
+    def failing(prompt):
+        calls.append("gemini")
+        return None
+
+    def working(prompt):
+        calls.append("openai")
+        return '{"cv_text": "ok"}'
+
+    monkeypatch.setattr(llm_service, "configured_providers", lambda: [("gemini", failing), ("openai", working)])
+
+    for _ in range(llm_service.BREAKER_THRESHOLD + 2):
+        assert llm_service.hybrid_llm("prompt") == '{"cv_text": "ok"}'
+
+    assert calls.count("gemini") == llm_service.BREAKER_THRESHOLD
+    assert llm_service.breaker_open("gemini")
+    assert llm_service.providers_available()
+
+
+def test_providers_unavailable_when_all_breakers_open(monkeypatch):
+    monkeypatch.setattr(llm_service, "configured_providers", lambda: [("gemini", lambda p: None)])
+
+    for _ in range(llm_service.BREAKER_THRESHOLD):
+        with pytest.raises(Exception, match="All LLM providers failed"):
+            llm_service.hybrid_llm("prompt")
+
+    assert not llm_service.providers_available()
+
+
+def test_record_then_replay_offline(monkeypatch, tmp_path):
+    cassette_path = tmp_path / "cassettes" / "run.jsonl"
+    monkeypatch.setattr(llm_service, "recorder", llm_service.CassetteRecorder(cassette_path))
+    monkeypatch.setattr(llm_service, "configured_providers", lambda: [
+        ("gemini", lambda p: None),
+        ("openai", lambda p: '{"cv_text": "recorded"}'),
+    ])
+    assert llm_service.hybrid_llm("same prompt") == '{"cv_text": "recorded"}'
+    assert len(cassette_path.read_text(encoding="utf-8").splitlines()) == 2
+
+    # replay serves the response without touching any provider
+    monkeypatch.undo()
+    llm_service._breakers.clear()
+    monkeypatch.setattr(llm_service, "player", llm_service.CassettePlayer(cassette_path))
+    assert llm_service.configured_providers()[0][0] == "replay"
+    assert llm_service.hybrid_llm("same prompt") == '{"cv_text": "recorded"}'
+
+    # misses fail loudly and never open the replay breaker
+    for _ in range(llm_service.BREAKER_THRESHOLD + 1):
+        with pytest.raises(CassetteMiss, match=prompt_hash("unknown prompt")):
+            llm_service.hybrid_llm("unknown prompt")
+    assert llm_service.providers_available()
+    assert llm_service.hybrid_llm("same prompt") == '{"cv_text": "recorded"}'
+
+
+def test_replay_reproduces_chunk_timing(tmp_path):
+    cassette_path = tmp_path / "stream.jsonl"
+    recorder = llm_service.CassetteRecorder(cassette_path)
+    recorder.record("gemini", "p", None, 0.05)
+    recorder.record("openai", "p", '{"a": 1}', 0.10, chunks=[(0.02, '{"a"'), (0.10, ': 1}')])
+
+    player = llm_service.CassettePlayer(cassette_path, realtime=True)
+    start = time.monotonic()
+    arrivals = [(time.monotonic() - start, chunk) for chunk in player.stream("p")]
+
+    assert "".join(chunk for _, chunk in arrivals) == '{"a": 1}'
+    # chunks are offset by the 0.05 s spent on the failed provider
+    assert arrivals[0][0] >= 0.07
+    assert arrivals[1][0] >= 0.15
+
+    assert llm_service.CassettePlayer(cassette_path, match="sequence").play("other prompt") == '{"a": 1}'
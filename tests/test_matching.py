@@ -0,0 +1,76 @@
+# tests/test_matching.py
+
+import sys
+from pathlib import Path
+
+# Add repo root to Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from api.matching import extract_terms, rank_jobs, required_languages, skill_term
+
+
+def test_german_and_english_synonyms_share_a_term():
+    assert skill_term("Vertrieb") == skill_term("Sales") == "sales"
+    assert skill_term("Maschinelles Lernen") == "machine learning"
+    assert "project management" in extract_terms("Erfahrung im Projektmanagement und mit PostgreSQL")
+    assert "sql" in extract_terms("Erfahrung im Projektmanagement und mit PostgreSQL")
+
+
+def test_required_languages_reads_ger_levels():
+    text = "Sehr gute Deutschkenntnisse (mind. B2), fließend Englisch. Standort in Deutschland."
+    assert required_languages(text) == {"de": "b2", "en": "c1"}
+    assert required_languages("Wir sind ein German company") == {}
+    assert required_languages("Englischkenntnisse von Vorteil") == {"en": "b1"}
+
+
+def test_rank_jobs_orders_by_fit_and_penalizes_missing_languages():
+    candidate = {
+        "skills": ["Python", "SQL", "Datenanalyse"],
+        "languages": [{"language": "Deutsch", "level": "B2"}],
+    }
+    jobs = [
+        {"id": "cook", "title": "Koch", "text": "Kochen in der Großküche, Teamfähigkeit."},
+        {"id": "analyst", "title": "Data Analyst", "text": "Python, MySQL, Data Analytics. Deutsch B2."},
+        {"id": "analyst-c2", "title": "Data Analyst", "text": "Python, MySQL, Data Analytics. Deutsch C2."},
+    ]
+    results = rank_jobs(candidate, jobs, top_k=3)
+
+    assert [r["id"] for r in results] == ["analyst", "analyst-c2", "cook"]
+    assert results[0]["matched_skills"] == ["data analysis", "python", "sql"]
+    assert abs(results[1]["score"] - results[0]["score"] / 4) < 1e-3
+    assert results[1]["missing_languages"] == [{"language": "de", "required": "C2", "have": "B2"}]
+
+
+def test_unknown_multi_word_skills_match_ad_ngrams():
+    candidate = {"skills": ["Power BI", "Spring Boot", "Python"]}
+    jobs = [
+        {"id": "bi", "title": "BI Developer", "text": "Reports mit Power BI, Backend mit Spring Boot."},
+        {"id": "power", "title": "Elektriker", "text": "Power Tools, Boot Camp im Frühling."},
+    ]
+    results = rank_jobs(candidate, jobs, top_k=2)
+
+    assert results[0]["id"] == "bi" and results[0]["score"] > 0
+    assert results[0]["matched_skills"] == ["power bi", "spring boot"]
+    assert results[1]["score"] == 0.0
+    assert skill_term("Erfahrung mit Power BI") == "power bi"
+
+
+def test_one_letter_skills_match():
+    candidate = {"skills": ["R", "C"]}
+    jobs = [
+        {"id": "stats", "title": "Statistiker", "text": "Auswertungen in R und SAS."},
+        {"id": "embedded", "title": "Embedded Entwickler", "text": "Firmware in C, Mikrocontroller."},
+        {"id": "cook", "title": "Koch (m/w/d)", "text": "Kochen in der Großküche."},
+    ]
+    results = {r["id"]: r for r in rank_jobs(candidate, jobs, top_k=3)}
+
+    assert results["stats"]["matched_skills"] == ["r"]
+    assert results["embedded"]["matched_skills"] == ["c"]
+    assert results["cook"]["score"] == 0.0
+
+
+def test_common_words_are_no_skill_synonyms():
+    terms = extract_terms("Container beladen, den Rest erledigt der Office Manager im Lager, KI")
+    assert not {"docker", "rest api", "microsoft office", "warehouse", "artificial intelligence"} & set(terms)
+    assert skill_term("Docker") == "docker"
+    assert skill_term("REST-API") == "rest api"
+    assert skill_term("Künstliche Intelligenz") == "artificial intelligence"
@@ -0,0 +1,71 @@
+# tests/test_packaging.py
+
+import io
+import sys
+from pathlib import Path
+
+import fitz
+import pytest
+from PIL import Image, ImageDraw
+
+# Add repo root to Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from api import packaging
+from api.packaging import PacketTooLarge, build_packet, iter_file, packet_filename
+
+
+def _scan(dpi: int) -> bytes:
+    # one A4 page covered by a striped JPEG "scan" at the given resolution
+    width, height = int(8.27 * dpi), int(11.69 * dpi)
+    image = Image.new("RGB", (width, height), (245, 245, 240))
+    draw = ImageDraw.Draw(image)
+    for y in range(0, height, 9):
+        draw.rectangle((30 + (y * 7) % 50, y, width - (y * 13) % 70, y + 4), fill=(40 + y % 90, 40, 60))
+    jpeg = io.BytesIO()
+    image.save(jpeg, "JPEG", quality=90)
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_image(page.rect, stream=jpeg.getvalue())
+    return doc.tobytes()
+
+
+def _build(attachments, **kwargs) -> fitz.Document:
+    packet, size, pages = build_packet("Sehr geehrte Damen und Herren,", "Lebenslauf\n" * 200, attachments, **kwargs)
+    data = b"".join(iter_file(packet))
+    assert len(data) == size
+    doc = fitz.open("pdf", data)
+    assert doc.page_count == pages
+    return doc
+
+
+def test_text_documents_share_one_font():
+    doc = _build([], name="Jörg Müller")
+
+    assert doc.page_count > 2  # the CV overflows onto a second page
+    assert "Anschreiben - Jörg Müller" in doc[0].get_text()
+    assert {font[0] for page in doc for font in page.get_fonts()} == {doc[0].get_fonts()[0][0]}
+
+
+def test_scans_are_downsampled_unless_disabled():
+    scan = _scan(300)
+
+    kept = _build([("Zeugnis.pdf", io.BytesIO(scan))], image_dpi=0)
+    assert kept[-1].get_images(full=True)[0][2] == 2481
+
+    shrunk = _build([("Zeugnis.pdf", io.BytesIO(scan))], image_dpi=100)
+    width = shrunk[-1].get_images(full=True)[0][2]
+    assert width <= 827 * packaging.DPI_TOLERANCE
+    assert "Zeugnis.pdf" in [entry[1] for entry in shrunk.get_toc()]
+
+
+def test_limits(monkeypatch):
+    scan = _scan(50)
+    monkeypatch.setattr(packaging, "PACKET_MAX_PAGES", 3)
+    with pytest.raises(PacketTooLarge):
+        build_packet("Anschreiben", "Lebenslauf", [(f"Zeugnis {i}.pdf", io.BytesIO(scan)) for i in range(2)])
+
+    monkeypatch.setattr(packaging, "ATTACHMENT_MAX_BYTES", 10)
+    with pytest.raises(PacketTooLarge):
+        build_packet("Anschreiben", "Lebenslauf", [("Zeugnis.pdf", io.BytesIO(scan))])
+
+    assert packet_filename("Jörg Müller") == "Bewerbungsmappe_Jorg_Muller.pdf"
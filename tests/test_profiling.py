@@ -0,0 +1,70 @@
+# tests/test_profiling.py
+
+import contextvars
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add repo root to Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from api import profiling
+
+
+def busy_render(seconds):
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        sum(range(100))
+    return "done"
+
+
+def test_sampling_profiler_follows_request_into_worker_thread(tmp_path):
+    profiler = profiling.SamplingProfiler(interval=0.001)
+    token = profiling._active.set(profiler)
+    profiler.start()
+    try:
+        # like run_in_threadpool, the worker runs in a copy of the request context
+        context = contextvars.copy_context()
+        worker = threading.Thread(target=context.run, args=(profiling.run_profiled, busy_render, 0.1))
+        worker.start()
+        worker.join()
+    finally:
+        profiler.stop()
+        profiling._active.reset(token)
+
+    path = profiler.write("/generate-resume", directory=tmp_path)
+    lines = path.read_text(encoding="utf-8").splitlines()
+
+    assert "-generate-resume-" in path.name
+    assert any("test_profiling.py:busy_render" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+
+def test_run_profiled_is_passthrough_when_off():
+    assert profiling._active.get() is None
+    assert profiling.run_profiled(busy_render, 0) == "done"
+
+
+def test_middleware_profiles_only_requests_with_the_token(monkeypatch, tmp_path):
+    from fastapi import FastAPI
+    from fastapi.responses import StreamingResponse
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    app = FastAPI()
+    app.add_middleware(profiling.ProfileMiddleware)
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter([b"a", b"b"]), media_type="text/plain")
+
+    client = TestClient(app)
+    plain = client.get("/stream")
+    assert plain.text == "ab" and "x-applify-profile-file" not in plain.headers
+    assert list(tmp_path.iterdir()) == []
+
+    profiled = client.get("/stream", headers={profiling.PROFILE_HEADER: "secret"})
+    assert profiled.text == "ab"
+    assert Path(profiled.headers["x-applify-profile-file"]).exists()
+    assert client.get("/stream", headers={profiling.PROFILE_HEADER: "wrong"}).headers.get("x-applify-profile-file") is None
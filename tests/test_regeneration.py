@@ -0,0 +1,57 @@
+# tests/test_regeneration.py
+
+import sys
+from pathlib import Path
+
+# Add repo root to Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from api.regeneration import GenerationStore, SqliteGenerationStore, plan_regeneration
+
+
+def test_plan_patches_structured_data_instead_of_llm():
+    previous = {"cv_data": {"name": "Max"}, "cover_letter_data": {"sender_name": "Max"}}
+    llm, cv_patch, cl_patch = plan_regeneration(
+        {"name": "Moritz", "salutation": "Sehr geehrte Frau Schmidt,"}, previous, include_simple=False
+    )
+
+    assert llm == set()
+    assert cv_patch == {"name": "Moritz"}
+    assert cl_patch == {"sender_name": "Moritz", "salutation": "Sehr geehrte Frau Schmidt,"}
+
+
+def test_plan_regenerates_dependent_sections_only():
+    llm, cv_patch, cl_patch = plan_regeneration({"languages": []}, {}, include_simple=True)
+    assert llm == {"cv_text", "cv_simple"}
+
+    llm, _, _ = plan_regeneration({"salutation": "Hallo"}, {}, include_simple=False)
+    assert llm == {"cover_letter_text"}
+
+    llm, _, _ = plan_regeneration({"job_description": "Neue Stelle"}, {}, include_simple=True)
+    assert "unterlagen_info" in llm and len(llm) == 5
+
+
+def test_generation_store_evicts_oldest():
+    store = GenerationStore(max_entries=2)
+    first = store.save({"n": 1})
+    second = store.save({"n": 2})
+    store.get(first)  # touch, so second becomes the oldest
+    store.save({"n": 3})
+
+    assert store.get(first) == {"n": 1}
+    assert store.get(second) is None
+
+
+def test_sqlite_store_is_shared_between_workers(tmp_path):
+    # two store instances stand for two worker processes
+    db = tmp_path / "generations.sqlite3"
+    worker_a = SqliteGenerationStore(db, max_entries=2)
+    worker_b = SqliteGenerationStore(db, max_entries=2)
+
+    first = worker_a.save({"model_out": {"cv_text": "Lebenslauf"}})
+    assert worker_b.get(first) == {"model_out": {"cv_text": "Lebenslauf"}}
+
+    second = worker_b.save({"n": 2})
+    worker_a.get(first)  # touch, so second becomes the oldest
+    worker_a.save({"n": 3})
+    assert worker_b.get(first) is not None
+    assert worker_b.get(second) is None
@@ -0,0 +1,48 @@
+# tests/test_template_engine.py
+
+import sys
+from pathlib import Path
+
+# Add repo root to Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from api.format_engine import render_cv_text, render_cover_letter_text
+from api.template_engine import TemplateEngine
+
+
+def test_template_engine_renders_without_llm():
+    candidate = {
+        "name": "Max Mustermann",
+        "email": "max.mustermann@example.com",
+        "address": "Musterstraße 1, 10115 Berlin",
+        "skills": ["Python", "FastAPI"],
+        "experience": [
+            {"job_title": "Werkstudent", "company": "Müller & Co", "end_date": "09/2019"},
+            {"job_title": "Software Engineer", "company": "Example GmbH", "end_date": "heute"},
+        ],
+        "languages": [{"language": "Deutsch", "level": "C1"}],
+        "job_description": "Backend Entwickler (m/w/d)\nWir suchen Verstärkung.",
+    }
+
+    out = TemplateEngine().generate_documents(candidate)
+    cv_text = render_cv_text(out["cv_data"])
+    cover_letter_text = render_cover_letter_text(out["cover_letter_data"])
+
+    # newest position first, plain text (no HTML escaping)
+    assert cv_text.index("Software Engineer") < cv_text.index("Werkstudent")
+    assert "Müller & Co" in cv_text
+    assert "Deutsch — C1" in cv_text
+    assert "Betreff: Bewerbung als Backend Entwickler (m/w/d)" in cover_letter_text
+    assert out["cover_letter_data"]["place"] == "Berlin"
+    assert out["unterlagen_info"]
+
+
+def test_year_only_end_dates_sort_by_year():
+    experience = [
+        {"job_title": "A", "end_date": "06/2015"},
+        {"job_title": "B", "end_date": "2010"},
+        {"job_title": "C", "end_date": "2019"},
+        {"job_title": "D", "end_date": "heute"},
+        {"job_title": "E", "end_date": ""},
+    ]
+    cv_data = TemplateEngine().generate_documents({"name": "Max", "experience": experience})["cv_data"]
+    assert [e["end_date"] for e in cv_data["experience"]] == ["heute", "", "2019", "06/2015", "2010"]
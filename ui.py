@@ -4,12 +4,26 @@ import requests
 import pdfplumber
 import docx
 from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 import base64
+import hashlib
 import json
+import os
 import re
+import time
 
 # ========== CONFIG ==========
-API_URL = st.secrets.get("APPLIFY_API_URL", "http://localhost:8000/generate-resume")
+def _config_api_url():
+    # environment (e.g. docker-compose) first, then Streamlit secrets
+    if os.getenv("APPLIFY_API_URL"):
+        return os.getenv("APPLIFY_API_URL")
+    if st.secrets.load_if_toml_exists() and "APPLIFY_API_URL" in st.secrets:
+        return st.secrets["APPLIFY_API_URL"]
+    return "http://localhost:8000/generate-resume"
+
+API_URL = _config_api_url()
+PACKET_URL = API_URL.rsplit("/", 1)[0] + "/bewerbungsmappe"
 # If you store it in .env or Streamlit secrets, it will be picked up.
 # ============================
 
@@ -27,28 +41,87 @@ if "parsed_payload" not in st.session_state:
     st.session_state.parsed_payload = None
 if "output_language" not in st.session_state:
     st.session_state.output_language = "de"  # default German
+if "generation_jobs" not in st.session_state:
+    st.session_state.generation_jobs = {}  # payload hash -> {"future", "submitted_at"}
+if "active_generation" not in st.session_state:
+    st.session_state.active_generation = None
+
+# Shared across sessions: one pooled HTTP session and a small worker pool
+@st.cache_resource
+def get_http_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@st.cache_resource
+def get_executor():
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="applify-generate")
+
+def content_hash(data):
+    if not isinstance(data, bytes):
+        data = json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+# Helpers: extract text from uploaded file (cached by content hash; _data is not hashed)
+@st.cache_data(show_spinner=False, max_entries=32)
+def _extract_text_cached(name, file_hash, _data):
+    if name.endswith(".pdf"):
+        with pdfplumber.open(BytesIO(_data)) as pdf:
+            return "\n".join((p.extract_text() or "") for p in pdf.pages)
+    elif name.endswith(".docx"):
+        doc = docx.Document(BytesIO(_data))
+        return "\n".join(p.text for p in doc.paragraphs)
+    else:
+        return _data.decode("utf-8", errors="ignore")
 
-# Helpers: extract text from uploaded file
 def extract_text_from_file(uploaded):
     if not uploaded:
         return ""
     name = uploaded.name.lower()
-    if name.endswith(".pdf"):
-        try:
-            with pdfplumber.open(uploaded) as pdf:
-                return "\n".join((p.extract_text() or "") for p in pdf.pages)
-        except Exception as e:
-            st.error(f"Failed to extract PDF text: {e}")
-            return ""
-    elif name.endswith(".docx"):
-        try:
-            doc = docx.Document(uploaded)
-            return "\n".join(p.text for p in doc.paragraphs)
-        except Exception as e:
-            st.error(f"Failed to extract DOCX text: {e}")
-            return ""
-    else:
-        return uploaded.getvalue().decode("utf-8", errors="ignore")
+    data = uploaded.getvalue()
+    try:
+        return _extract_text_cached(name, content_hash(data), data)
+    except Exception as e:
+        kind = "PDF" if name.endswith(".pdf") else "DOCX"
+        st.error(f"Failed to extract {kind} text: {e}")
+        return ""
+
+# Helpers: backend calls
+def post_to_backend(payload, timeout, session=None):
+    # worker threads get the session passed in (no Streamlit context there)
+    r = (session or get_http_session()).post(API_URL, json=payload, timeout=timeout)
+    if r.status_code != 200:
+        raise RuntimeError(r.text)
+    return r.json()
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def parse_resume_cached(payload_hash, _payload):
+    # identical parse requests are answered from cache, never re-sent
+    return post_to_backend(_payload, timeout=60)
+
+def _needs_retry(future):
+    if not future.done():
+        return False
+    return future.exception() is not None or bool(future.result().get("degraded"))
+
+def submit_generation(payload):
+    """
+    Submit-then-poll: the request runs in a worker thread so the script (and
+    the UI) does not block. Identical payloads reuse the existing job/result,
+    unless it failed or came back degraded (template fallback while the LLM
+    was down or busy) - those are retried.
+    """
+    key = content_hash(payload)
+    jobs = st.session_state.generation_jobs
+    job = jobs.get(key)
+    if job is None or _needs_retry(job["future"]):
+        jobs[key] = {
+            "future": get_executor().submit(post_to_backend, payload, 120, get_http_session()),
+            "submitted_at": time.time(),
+        }
+    st.session_state.active_generation = key
 
 # Helper: try to prefill top-level fields from parsed payload
 def autofill_from_parsed(parsed):
@@ -99,6 +172,60 @@ def autofill_from_parsed(parsed):
     if parsed.get("languages") and not st.session_state.get("languages"):
         st.session_state.languages = parsed.get("languages")
 
+# Generation status / results
+@st.experimental_fragment(run_every=1)
+def generation_progress(job):
+    if job["future"].done():
+        st.rerun()  # full rerun renders the result and stops this polling
+    st.info(f"Generating CV and Cover Letter... {int(time.time() - job['submitted_at'])}s")
+
+def show_generation():
+    job = st.session_state.generation_jobs.get(st.session_state.active_generation)
+    if job is None:
+        return
+    if not job["future"].done():
+        generation_progress(job)
+        return
+    try:
+        out = job["future"].result()
+    except Exception as e:
+        st.error(f"Generation failed: {e}")
+        return
+
+    # show outputs
+    st.success("Generation complete!")
+    if out.get("degraded"):
+        st.warning(f"Template-only result (LLM unavailable): {out.get('degraded_reason', '')}")
+    st.subheader("CV Preview")
+    st.markdown(out.get("cv_text",""))
+    st.subheader("Cover Letter Preview")
+    st.markdown(out.get("cover_letter_text",""))
+
+    # downloads
+    if out.get("pdf_base64"):
+        pdf_bytes = base64.b64decode(out["pdf_base64"])
+        st.download_button("Download PDF", data=pdf_bytes, file_name="applify_output.pdf", mime="application/pdf")
+    if out.get("docx_base64"):
+        docx_bytes = base64.b64decode(out["docx_base64"])
+        st.download_button("Download DOCX", data=docx_bytes, file_name="applify_output.docx", mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+
+    # Bewerbungsmappe: cover letter + CV + certificates in one PDF
+    if out.get("generation_id"):
+        st.subheader("Bewerbungsmappe")
+        certificates = st.file_uploader("Zeugnisse / Zertifikate (PDF, newest first)", type=["pdf"], accept_multiple_files=True)
+        if st.button("Build Bewerbungsmappe"):
+            files = [("attachments", (f.name, f.getvalue(), "application/pdf")) for f in certificates or []]
+            with st.spinner("Assembling PDF..."):
+                r = get_http_session().post(PACKET_URL, data={"generation_id": out["generation_id"]}, files=files, timeout=120)
+            if r.status_code == 200:
+                file_name = re.search(r'filename="([^"]+)"', r.headers.get("Content-Disposition", ""))
+                st.download_button(
+                    "Download Bewerbungsmappe", data=r.content, mime="application/pdf",
+                    file_name=file_name.group(1) if file_name else "Bewerbungsmappe.pdf",
+                )
+            else:
+                st.error(f"Bewerbungsmappe failed: {r.text}")
+
 # UI layout: sidebar for inputs and upload
 with st.sidebar:
     st.header("Your details")
@@ -241,16 +368,14 @@ with right_col:
                         "parse_only": True,
                     }
                     try:
-                        r = requests.post(API_URL, json=payload, timeout=60)
-                        if r.status_code != 200:
-                            st.error(f"Parsing failed: {r.text}")
-                        else:
-                            data = r.json()
-                            # Expect backend to return parsed structure inside "parsed" or top-level fields
-                            parsed = data.get("parsed") or data.get("parsed_payload") or data
-                            st.session_state.parsed_payload = parsed
-                            autofill_from_parsed(parsed)
-                            st.success("Resume parsed and form auto-filled. Please review/edit fields before generating.")
+                        data = parse_resume_cached(content_hash(payload), payload)
+                        # Expect backend to return parsed structure inside "parsed" or top-level fields
+                        parsed = data.get("parsed") or data.get("parsed_payload") or data
+                        st.session_state.parsed_payload = parsed
+                        autofill_from_parsed(parsed)
+                        st.success("Resume parsed and form auto-filled. Please review/edit fields before generating.")
+                    except RuntimeError as e:
+                        st.error(f"Parsing failed: {e}")
                     except Exception as e:
                         st.error(f"Failed to call backend for parsing: {e}")
 
@@ -276,30 +401,9 @@ with right_col:
             "output_language": st.session_state.output_language,
             "want_pdf": want_pdf
         }
-        with st.spinner("Generating CV and Cover Letter..."):
-            try:
-                r = requests.post(API_URL, json=final_payload, timeout=120)
-                if r.status_code != 200:
-                    st.error(f"Generation failed: {r.text}")
-                else:
-                    out = r.json()
-                    # show outputs
-                    st.success("Generation complete!")
-                    st.subheader("CV Preview")
-                    st.markdown(out.get("cv_text",""))
-                    st.subheader("Cover Letter Preview")
-                    st.markdown(out.get("cover_letter_text",""))
-
-                    # downloads
-                    if want_pdf and out.get("pdf_base64"):
-                        pdf_bytes = base64.b64decode(out["pdf_base64"])
-                        st.download_button("Download PDF", data=pdf_bytes, file_name="applify_output.pdf", mime="application/pdf")
-                    if want_pdf and out.get("docx_base64"):
-                        docx_bytes = base64.b64decode(out["docx_base64"])
-                        st.download_button("Download DOCX", data=docx_bytes, file_name="applify_output.docx", mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document")
-
-            except Exception as e:
-                st.error(f"Error while generating: {e}")
+        submit_generation(final_payload)
+
+    show_generation()
 
 # Also allow generate from main area
 if st.button("Generate (main)"):